@@ -2,4 +2,4 @@
 set -e
 
 flake8 --config=flake8.cfg
-# python -m unittest discover
\ No newline at end of file
+python -m unittest discover
\ No newline at end of file
@@ -0,0 +1,137 @@
+# Rendering of Atlassian Document Format (ADF), the JSON format of Jira rich text fields, to plain text.
+from dataclasses import dataclass
+from typing import Callable, Mapping, Optional
+
+
+@dataclass(frozen=True)
+class NodeRule:
+    """
+    How a single ADF node type is rendered.
+    Args:
+        text: Returns the text of a node without content (e.g. "text" or "mention"); nothing is rendered if not set.
+        descend: Whether the content of the node is rendered. If False, the whole subtree is skipped.
+        before: Text written before the content of the node.
+        after: Text written after the content of the node.
+        content_rules: Rules applied to the direct children of the node instead of the renderer's rules, e.g. to
+            render only nodes at a certain position in the document.
+    """
+    text: Optional[Callable[[dict], str]] = None
+    descend: bool = True
+    before: str = ""
+    after: str = ""
+    content_rules: Optional[Mapping[str, "NodeRule"]] = None
+
+
+def _attrs_text(node):
+    return node.get("attrs", {}).get("text", "")
+
+
+def _attrs_url(node):
+    return node.get("attrs", {}).get("url", "")
+
+
+def _node_text(node):
+    return node.get("text", "")
+
+
+def _line_break(node):
+    return "\n"
+
+
+SKIP = NodeRule(descend=False)
+DESCEND = NodeRule()
+
+# rules used for issue descriptions and worklog comments; nodes with content are rendered, including code blocks
+DESCRIPTION_RULES = {
+    "paragraph": NodeRule(after="\n"),
+    "text": NodeRule(text=_node_text),
+    "hardBreak": NodeRule(text=_line_break),
+    "mention": NodeRule(text=_attrs_text),
+    "status": NodeRule(text=_attrs_text),
+    "inlineCard": NodeRule(text=_attrs_url),
+    "blockCard": NodeRule(text=_attrs_url),
+}
+
+# rules used for issue comments; only text and mentions directly in top-level paragraphs are kept, in a single line
+COMMENT_RULES = {
+    "doc": NodeRule(
+        content_rules={
+            "paragraph": NodeRule(
+                content_rules={
+                    "text": NodeRule(text=_node_text),
+                    "mention": NodeRule(text=_attrs_text),
+                }
+            ),
+        }
+    ),
+}
+
+
+class AdfRenderer:
+    def __init__(self, rules, default_rule=DESCEND):
+        self.rules = dict(rules)
+        self.default_rule = default_rule
+
+    def with_rules(self, **rules):
+        """Return a copy of the renderer with rules of the given node types replaced, e.g. codeBlock=SKIP."""
+        return AdfRenderer({**self.rules, **rules}, self.default_rule)
+
+    def render(self, node) -> str:
+        """
+        Render an ADF node, or a list of nodes, to text.
+        The tree is walked with an explicit stack of content lists being rendered and the text is joined once at
+        the end, so neither deeply nested documents nor very large ones are a problem.
+        """
+        if node is None:
+            return ""
+
+        default_rule = self.default_rule
+        fragments = []
+        append = fragments.append
+
+        # the content list being rendered, the rules it is rendered by and the text written once it is done;
+        # the same of the enclosing content lists are kept on the stack
+        items, rules, after = iter((node,)), self.rules, ""
+        stack = []
+
+        while True:
+            for item in items:
+                item_type = type(item)
+
+                if item_type is dict:
+                    rule = rules.get(item.get("type"), default_rule)
+
+                    if "content" in item:
+                        if rule.descend:
+                            if rule.before:
+                                append(rule.before)
+
+                            stack.append((items, rules, after))
+                            content = item["content"]
+                            items = iter(content) if type(content) is list else iter((content,))
+                            after = rule.after
+                            if rule.content_rules is not None:
+                                rules = rule.content_rules
+                            break
+
+                    elif rule.text is not None:
+                        append(rule.text(item))
+
+                elif item_type is list:
+                    stack.append((items, rules, after))
+                    items, after = iter(item), ""
+                    break
+
+            else:
+                if not stack:
+                    break
+
+                if after:
+                    append(after)
+                items, rules, after = stack.pop()
+
+        return "".join(fragments)
+
+
+DESCRIPTION_RENDERER = AdfRenderer(DESCRIPTION_RULES)
+COMMENT_RENDERER = AdfRenderer(COMMENT_RULES, default_rule=SKIP)
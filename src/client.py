@@ -1,19 +1,38 @@
+import asyncio
+import itertools
 import logging
+from collections import deque
 from keboola.component import UserException
 from urllib.parse import urljoin
 from keboola.http_client import AsyncHttpClient
 import httpx
 
+from http_cache import ResponseCache
+from json_codec import decode_json, decode_response
+from rate_limit import AdaptiveRateLimiter
+
 BASE_URL = "https://{0}.atlassian.net/rest/api/3/"
 AGILE_URL = "https://{0}.atlassian.net/rest/agile/1.0/"
 SERVICEDESK_URL = "https://{0}.atlassian.net/rest/servicedeskapi/"
 MAX_RESULTS = 100
 MAX_RESULTS_AGILE = 50
 MAX_RESULTS_SERVICEDESK = 50
+THROTTLED_RETRIES = 10
+PAGINATION_PREFETCH = 4
 
 
 class JiraClient(AsyncHttpClient):
-    def __init__(self, organization_id, username, api_token):
+    def __init__(
+        self,
+        organization_id,
+        username,
+        api_token,
+        max_requests_per_second=None,
+        max_parallel_requests=None,
+        cache_directory=None,
+        cache_ttls=None,
+        metrics=None,
+    ):
         self.param_base_url = BASE_URL.format(organization_id)
         self.param_agile_url = AGILE_URL.format(organization_id)
         self.param_servicedesk_url = SERVICEDESK_URL.format(organization_id)
@@ -24,21 +43,190 @@ class JiraClient(AsyncHttpClient):
             self.param_base_url,
             auth=(self.param_username, self.param_api_token),
             retries=5,
+            # 429 responses are retried in _request, so the pause applies to all requests and not only the throttled one
+            retry_status_codes=[500, 502, 503, 504],
             default_headers={
                 "accept": "application/json",
                 "content-type": "application/json",
             },
         )
 
+        self.rate_limiter = AdaptiveRateLimiter(max_rate=max_requests_per_second, max_in_flight=max_parallel_requests)
+        self.limiter = self.rate_limiter
+
+        if metrics is not None:
+            self.client.event_hooks = {"request": [metrics.request_hook], "response": [metrics.response_hook]}
+
+        self.response_cache = None
+        if cache_directory:
+            self.response_cache = ResponseCache(
+                cache_directory, namespace=f"{organization_id}/{username}", ttls=cache_ttls
+            )
+
+    async def _request(self, method, endpoint=None, params=None, headers=None, cache_endpoint=None, **kwargs):
+        """
+        Args:
+            cache_endpoint: Name of the endpoint in the response cache TTLs; GET responses are cached only if set.
+        """
+        if self.response_cache is None or cache_endpoint is None or method != "GET":
+            return await self._request_throttled(method, endpoint, params=params, headers=headers, **kwargs)
+
+        cache = self.response_cache
+        key = cache.key(endpoint, params, headers)
+        cached = cache.get(key)
+
+        if cached and cache.is_fresh(cached[0], cache_endpoint):
+            cache.hits += 1
+            return cache.to_response(*cached, httpx.Request(method, endpoint, params=params))
+
+        conditional_headers = cache.conditional_headers(cached[0]) if cached else {}
+        try:
+            response = await self._request_throttled(
+                method, endpoint, params=params, headers={**(headers or {}), **conditional_headers}, **kwargs
+            )
+
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 304 or not cached:
+                raise
+
+            cache.revalidated += 1
+            cache.touch(key, cached[0])
+            return cache.to_response(*cached, e.response.request)
+
+        cache.misses += 1
+        if response.status_code == 200:
+            cache.store(key, response)
+
+        return response
+
+    async def _request_throttled(self, method, endpoint=None, params=None, headers=None, **kwargs):
+        for attempt in range(THROTTLED_RETRIES + 1):
+            try:
+                response = await super()._request(method, endpoint, params=params, headers=headers, **kwargs)
+
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code != 429 or attempt == THROTTLED_RETRIES:
+                    raise
+
+                self.rate_limiter.throttle(e.response.headers)
+                continue
+
+            self.rate_limiter.update(response.headers)
+            return response
+
+    async def paginate(
+        self,
+        url,
+        page_size,
+        get_values,
+        error_message,
+        start_param="startAt",
+        limit_param="maxResults",
+        params=None,
+        headers=None,
+        prefetch=PAGINATION_PREFETCH,
+        cache_endpoint=None,
+    ):
+        """
+        Iterate over all pages of an offset-paginated endpoint.
+        After the first page, the next `prefetch` pages are requested speculatively; pages behind the end, which is
+        detected from isLast/isLastPage, the reported total or a short page, are cancelled or dropped.
+        Args:
+            url: Endpoint URL.
+            page_size: Number of items requested per page.
+            get_values: Extracts the list of items from a decoded page.
+            error_message: Message of the UserException raised on failure.
+            start_param: Name of the offset parameter.
+            limit_param: Name of the page size parameter.
+            params: Additional query parameters.
+            headers: Additional request headers.
+            prefetch: Maximum number of pages requested ahead.
+            cache_endpoint: Name of the endpoint in the response cache TTLs, if its pages may be cached.
+
+        Yields: Lists of items of each page, in order.
+
+        """
+
+        async def get_page(offset, limit):
+            try:
+                rsp = await self.get_raw(
+                    endpoint=url,
+                    params={**(params or {}), start_param: offset, limit_param: limit},
+                    headers=headers,
+                    cache_endpoint=cache_endpoint,
+                )
+
+                if rsp.status_code == 200:
+                    return decode_response(rsp)
+
+                else:
+                    raise UserException(f"{error_message}Received: {rsp.status_code} - {rsp.text}.")
+
+            except httpx.HTTPStatusError as e:
+                raise UserException(f"{error_message}Received: {e.response.status_code} - {e.response.text}.")
+
+        js = await get_page(0, page_size)
+        values = get_values(js)
+        yield values
+
+        # the server may return fewer items per page than requested, both the following offsets and the detection
+        # of a short last page must follow its page size
+        if isinstance(js, dict) and js.get("maxResults"):
+            page_size = js["maxResults"]
+
+        if self._is_last_page(js, values, page_size):
+            return
+
+        total = js.get("total") if isinstance(js, dict) else None
+        if total is not None:
+            offsets = iter(range(page_size, total, page_size))
+        else:
+            offsets = itertools.count(page_size, page_size)
+        pending = deque()
+
+        try:
+            while True:
+                for offset in itertools.islice(offsets, max(prefetch, 1) - len(pending)):
+                    pending.append(asyncio.create_task(get_page(offset, page_size)))
+
+                if not pending:
+                    return
+
+                js = await pending.popleft()
+                values = get_values(js)
+                yield values
+
+                if self._is_last_page(js, values, page_size):
+                    return
+
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    @staticmethod
+    async def collect(pages):
+        return [item async for page in pages for item in page]
+
+    @staticmethod
+    def _is_last_page(js, values, page_size):
+        if isinstance(js, dict):
+            if "isLast" in js:
+                return bool(js["isLast"])
+            if "isLastPage" in js:
+                return bool(js["isLastPage"])
+
+        return len(values) < page_size
+
     async def get_projects(self):
         url_projects = urljoin(self.param_base_url, "project")
         par_projects = {"expand": "description"}
 
         try:
-            rsp_projects = await self.get_raw(endpoint=url_projects, params=par_projects)
+            rsp_projects = await self.get_raw(endpoint=url_projects, params=par_projects, cache_endpoint="projects")
 
             if rsp_projects.status_code == 200:
-                return rsp_projects.json()
+                return decode_response(rsp_projects)
             else:
                 raise UserException(
                     f"Unable to get projects from {self.param_base_url}. "
@@ -62,7 +250,7 @@ class JiraClient(AsyncHttpClient):
 
         try:
             r = await self.get_raw(endpoint=url_comments, params=params)
-            sc, js = r.status_code, r.json()
+            sc, js = r.status_code, decode_response(r)
 
             if sc == 200:
                 comments = js["comments"]
@@ -76,50 +264,57 @@ class JiraClient(AsyncHttpClient):
 
         return comments
 
-    async def get_changelogs(self, issue_key):
-        url_changelogs = urljoin(self.param_base_url, f"issue/{issue_key}/changelog")
-        offset = 0
-        all_changelogs = []
-        is_complete = False
-
-        while is_complete is False:
-            params_changelogs = {"startAt": offset, "maxResults": MAX_RESULTS}
+    async def get_changelogs(self, issue_key, concurrency=PAGINATION_PREFETCH):
+        return await self.collect(self.iter_changelogs(issue_key, concurrency))
 
-            try:
-                rsp_changelogs = await self.get_raw(endpoint=url_changelogs, params=params_changelogs)
-                sc_changelogs, js_changelogs = (
-                    rsp_changelogs.status_code,
-                    rsp_changelogs.json(),
-                )
+    def iter_changelogs(self, issue_key, concurrency=PAGINATION_PREFETCH):
+        url_changelogs = urljoin(self.param_base_url, f"issue/{issue_key}/changelog")
 
-                if sc_changelogs == 200:
-                    all_changelogs += js_changelogs["values"]
-                    offset += MAX_RESULTS
-                    is_complete = js_changelogs["isLast"]
+        return self.paginate(
+            url_changelogs,
+            MAX_RESULTS,
+            lambda js: js["values"],
+            f"Could not download changelogs for issue {issue_key}.",
+            prefetch=concurrency,
+        )
 
-                else:
-                    raise UserException(
-                        f"Could not download changelogs for issue {issue_key}."
-                        f"Received: {sc_changelogs} - {js_changelogs}."
-                    )
+    async def get_issues(
+        self, update_date, next_page_token, issue_jql_filter, update_date_to=None, fields=None, expand_changelog=True
+    ):
+        content = await self.get_issues_raw(
+            update_date, next_page_token, issue_jql_filter, update_date_to, fields, expand_changelog
+        )
+        data = decode_json(content)
+        issues = data.get("issues", [])
 
-            except httpx.HTTPStatusError as e:
-                raise UserException(
-                    f"Could not download changelogs for issue {issue_key}."
-                    f"Received: {e.response.status_code} - {e.response.text}."
-                )
+        next_token = data.get("nextPageToken")
+        if "isLast" in data:
+            is_complete = bool(data["isLast"])
+        else:
+            is_complete = not bool(next_token)
 
-        return all_changelogs
+        return issues, is_complete, next_token
 
-    async def get_issues(self, update_date, next_page_token, issue_jql_filter):
+    async def get_issues_raw(
+        self, update_date, next_page_token, issue_jql_filter, update_date_to=None, fields=None, expand_changelog=True
+    ):
+        """Same as get_issues, but returns the undecoded response body, e.g. to be decoded in a worker process."""
         url_issues = urljoin(self.param_base_url, "search/jql")
 
         if issue_jql_filter:
             param_jql = issue_jql_filter
         else:
-            param_jql = f"updated >= {update_date}" if update_date else None
+            conditions = []
+            if update_date:
+                conditions.append(f'updated >= "{update_date}"')
+            if update_date_to:
+                conditions.append(f'updated < "{update_date_to}"')
+            param_jql = " AND ".join(conditions) or None
+
+        payload = {"jql": param_jql, "maxResults": MAX_RESULTS, "fields": fields or ["*all"]}
 
-        payload = {"jql": param_jql, "maxResults": MAX_RESULTS, "expand": "changelog", "fields": ["*all"]}
+        if expand_changelog:
+            payload["expand"] = "changelog"
 
         if next_page_token:
             payload["nextPageToken"] = next_page_token
@@ -127,171 +322,78 @@ class JiraClient(AsyncHttpClient):
         try:
             rsp = await self.post_raw(endpoint=url_issues, json=payload)
             if rsp.status_code == 200:
-                data = rsp.json()
-                issues = data.get("issues", [])
-
-                next_token = data.get("nextPageToken")
-                if "isLast" in data:
-                    is_complete = bool(data["isLast"])
-                else:
-                    is_complete = not bool(next_token)
-
-                return issues, is_complete, next_token
+                return rsp.content
             else:
                 raise UserException(f"Could not download issues.Received: {rsp.status_code} - {rsp.text}.")
         except httpx.HTTPStatusError as e:
             raise UserException(f"Could not download issues.Received: {e.response.status_code} - {e.response.text}.")
 
     async def get_users(self):
-        url_users = urljoin(self.param_base_url, "users")
-        offset = 0
-        all_users = []
-        is_complete = False
+        return await self.collect(self.iter_users())
 
-        while is_complete is False:
-            params_users = {"startAt": offset, "maxResults": MAX_RESULTS}
-
-            try:
-                rsp_users = await self.get_raw(endpoint=url_users, params=params_users)
-
-                if rsp_users.status_code == 200:
-                    _usr = rsp_users.json()
-                    all_users += _usr
-
-                    if len(_usr) < MAX_RESULTS:
-                        is_complete = True
-
-                    else:
-                        offset += MAX_RESULTS
-
-                else:
-                    raise UserException(
-                        f"Could not download users.Received: {rsp_users.status_code} - {rsp_users.text}."
-                    )
-
-            except httpx.HTTPStatusError as e:
-                raise UserException(f"Could not download users.Received: {e.response.status_code} - {e.response.text}.")
+    def iter_users(self):
+        url_users = urljoin(self.param_base_url, "users")
 
-        return all_users
+        return self.paginate(
+            url_users, MAX_RESULTS, lambda js: js, "Could not download users.", cache_endpoint="users"
+        )
 
     async def get_organizations(self):
-        url_organizations = urljoin(self.param_servicedesk_url, "organization")
-        offset = 0
-        all_organizations = []
-        is_complete = False
-
-        while is_complete is False:
-            params_organizations = {"start": offset, "limit": MAX_RESULTS_SERVICEDESK}
+        return await self.collect(self.iter_organizations())
 
-            try:
-                rsp_organizations = await self.get_raw(endpoint=url_organizations, params=params_organizations)
-
-                if rsp_organizations.status_code == 200:
-                    _usr = rsp_organizations.json()["values"]
-                    all_organizations += _usr
-
-                    if len(_usr) < MAX_RESULTS_SERVICEDESK:
-                        is_complete = True
-
-                    else:
-                        offset += MAX_RESULTS_SERVICEDESK
-
-                else:
-                    raise UserException(
-                        f"Could not download organizations."
-                        f"Received: {rsp_organizations.status_code} - {rsp_organizations.text}."
-                    )
-
-            except httpx.HTTPStatusError as e:
-                raise UserException(
-                    f"Could not download organizations.Received: {e.response.status_code} - {e.response.text}."
-                )
+    def iter_organizations(self):
+        url_organizations = urljoin(self.param_servicedesk_url, "organization")
 
-        return all_organizations
+        return self.paginate(
+            url_organizations,
+            MAX_RESULTS_SERVICEDESK,
+            lambda js: js["values"],
+            "Could not download organizations.",
+            start_param="start",
+            limit_param="limit",
+        )
 
     async def get_servicedesks(self):
-        url_organizations = urljoin(self.param_servicedesk_url, "servicedesk")
-        offset = 0
-        all_servicedesks = []
-        is_complete = False
-
-        while is_complete is False:
-            params_servicedesks = {"start": offset, "limit": MAX_RESULTS_SERVICEDESK}
-
-            try:
-                rsp_servicedesks = await self.get_raw(endpoint=url_organizations, params=params_servicedesks)
-
-                if rsp_servicedesks.status_code == 200:
-                    _usr = rsp_servicedesks.json()["values"]
-                    all_servicedesks += _usr
-
-                    if len(_usr) < MAX_RESULTS_SERVICEDESK:
-                        is_complete = True
-
-                    else:
-                        offset += MAX_RESULTS_SERVICEDESK
-
-                else:
-                    raise UserException(
-                        f"Could not download servicedesks."
-                        f"Received: {rsp_servicedesks.status_code} - {rsp_servicedesks.text}."
-                    )
-
-            except httpx.HTTPStatusError as e:
-                raise UserException(
-                    f"Could not download servicedesks.Received: {e.response.status_code} - {e.response.text}."
-                )
-
-        return all_servicedesks
+        return await self.collect(self.iter_servicedesks())
+
+    def iter_servicedesks(self):
+        url_servicedesks = urljoin(self.param_servicedesk_url, "servicedesk")
+
+        return self.paginate(
+            url_servicedesks,
+            MAX_RESULTS_SERVICEDESK,
+            lambda js: js["values"],
+            "Could not download servicedesks.",
+            start_param="start",
+            limit_param="limit",
+            cache_endpoint="servicedesks",
+        )
 
     async def get_servicedesk_customers(self, servicedesk_id: str):
-        url_organization_users = urljoin(self.param_servicedesk_url, f"servicedesk/{servicedesk_id}/customer")
-        offset = 0
-        all_users = []
-        is_complete = False
-
-        while is_complete is False:
-            params_organization_users = {
-                "start": offset,
-                "limit": MAX_RESULTS_SERVICEDESK,
-            }
-
-            try:
-                rsp_users = await self.get_raw(
-                    endpoint=url_organization_users,
-                    params=params_organization_users,
-                    headers={"X-ExperimentalApi": "opt-in"},
-                )
-
-                if rsp_users.status_code == 200:
-                    _usr = rsp_users.json()["values"]
-                    all_users += _usr
-
-                    if len(_usr) < MAX_RESULTS_SERVICEDESK:
-                        is_complete = True
-
-                    else:
-                        offset += MAX_RESULTS_SERVICEDESK
-
-                else:
-                    raise UserException(
-                        f"Could not download users.Received: {rsp_users.status_code} - {rsp_users.text}."
-                    )
+        return await self.collect(self.iter_servicedesk_customers(servicedesk_id))
 
-            except httpx.HTTPStatusError as e:
-                raise UserException(f"Could not download users.Received: {e.response.status_code} - {e.response.text}.")
+    def iter_servicedesk_customers(self, servicedesk_id: str):
+        url_organization_users = urljoin(self.param_servicedesk_url, f"servicedesk/{servicedesk_id}/customer")
 
-        return all_users
+        return self.paginate(
+            url_organization_users,
+            MAX_RESULTS_SERVICEDESK,
+            lambda js: js["values"],
+            "Could not download users.",
+            start_param="start",
+            limit_param="limit",
+            headers={"X-ExperimentalApi": "opt-in"},
+        )
 
     async def get_fields(self):
         url_fields = urljoin(self.param_base_url, "field")
         params_fields = {"expand": "projects.issuetypes.fields"}
 
         try:
-            rsp_fields = await self.get_raw(endpoint=url_fields, params=params_fields)
+            rsp_fields = await self.get_raw(endpoint=url_fields, params=params_fields, cache_endpoint="fields")
 
             if rsp_fields.status_code == 200:
-                return rsp_fields.json()
+                return decode_response(rsp_fields)
 
             else:
                 raise UserException(
@@ -307,54 +409,46 @@ class JiraClient(AsyncHttpClient):
             yield list_split[i: i + chunk_size]
 
     async def get_deleted_worklogs(self, since=None):
-        url_deleted = urljoin(self.param_base_url, "worklog/deleted")
-        param_since = since
-        is_complete = False
-        all_worklogs = []
-
-        while is_complete is False:
-            params_deleted = {"since": param_since}
+        all_worklogs, until = [], since
+        async for values, until in self.iter_deleted_worklogs(since):
+            all_worklogs += values
 
-            try:
-                rsp_deleted = await self.get_raw(endpoint=url_deleted, params=params_deleted)
+        return all_worklogs, until
 
-                if rsp_deleted.status_code == 200:
-                    js_worklogs = rsp_deleted.json()
-                    all_worklogs += js_worklogs["values"]
-
-                    if js_worklogs["lastPage"] is True:
-                        is_complete = True
-
-                    else:
-                        param_since = js_worklogs["until"]
-
-                else:
-                    raise UserException(
-                        f"Could not download deleted worklogs.Received: {rsp_deleted.status_code} - {rsp_deleted.text}."
-                    )
+    def iter_deleted_worklogs(self, since=None):
+        url_deleted = urljoin(self.param_base_url, "worklog/deleted")
+        return self._iter_since_pages(url_deleted, since, "Could not download deleted worklogs.")
 
-            except httpx.HTTPStatusError as e:
-                raise UserException(
-                    f"Could not download deleted worklogs.Received: {e.response.status_code} - {e.response.text}."
-                )
+    async def get_updated_worklogs(self, since=None):
+        all_worklogs, until = [], since
+        async for values, until in self.iter_updated_worklogs(since):
+            all_worklogs += values
 
-        return all_worklogs
+        return all_worklogs, until
 
-    async def get_updated_worklogs(self, since=None):
+    def iter_updated_worklogs(self, since=None):
         url_updated = urljoin(self.param_base_url, "worklog/updated")
+        return self._iter_since_pages(url_updated, since, "Could not download updated worklogs.")
+
+    async def _iter_since_pages(self, url, since, error_message):
+        """
+        Iterate over an endpoint paginated by the "since" timestamp, e.g. worklog/updated.
+        Yields: (values, until) of each page; "until" of the last page is where the next run can continue from.
+        """
         param_since = since
+        param_until = since
         is_complete = False
-        all_worklogs = []
 
         while is_complete is False:
-            params_updated = {"since": param_since}
+            params = {"since": param_since}
 
             try:
-                rsp_updated = await self.get_raw(endpoint=url_updated, params=params_updated)
+                rsp = await self.get_raw(endpoint=url, params=params)
 
-                if rsp_updated.status_code == 200:
-                    js_worklogs = rsp_updated.json()
-                    all_worklogs += js_worklogs["values"]
+                if rsp.status_code == 200:
+                    js_worklogs = decode_response(rsp)
+                    param_until = js_worklogs.get("until") or param_until
+                    yield js_worklogs["values"], param_until
 
                     if js_worklogs["lastPage"] is True:
                         is_complete = True
@@ -363,28 +457,24 @@ class JiraClient(AsyncHttpClient):
                         param_since = js_worklogs["until"]
 
                 else:
-                    raise UserException(
-                        f"Could not download updated worklogs.Received: {rsp_updated.status_code} - {rsp_updated.text}."
-                    )
+                    raise UserException(f"{error_message}Received: {rsp.status_code} - {rsp.text}.")
 
             except httpx.HTTPStatusError as e:
-                raise UserException(
-                    f"Could not download updated worklogs.Received: {e.response.status_code} - {e.response.text}."
-                )
-
-        return all_worklogs
+                raise UserException(f"{error_message}Received: {e.response.status_code} - {e.response.text}.")
 
     async def get_worklogs(self, worklog_ids):
+        return await self.collect(self.iter_worklogs(worklog_ids))
+
+    async def iter_worklogs(self, worklog_ids):
         url_worklogs = urljoin(self.param_base_url, "worklog/list")
         list_gen = self.split_list_to_chunks(worklog_ids, 1000)
-        all_worklogs = []
 
         for w_list in list_gen:
             try:
                 rsp_worklogs = await self.post_raw(endpoint=url_worklogs, json={"ids": w_list})
 
                 if rsp_worklogs.status_code == 200:
-                    all_worklogs += rsp_worklogs.json()
+                    yield decode_response(rsp_worklogs)
 
                 else:
                     raise UserException(
@@ -397,37 +487,19 @@ class JiraClient(AsyncHttpClient):
                     f"Could not download changed worklogs.Received: {e.response.status_code} - {e.response.text}."
                 )
 
-        return all_worklogs
-
     async def get_all_boards(self):
-        url_boards = urljoin(self.param_agile_url, "board")
-        offset = 0
-        is_complete = False
-        all_boards = []
+        return await self.collect(self.iter_all_boards())
 
-        while is_complete is False:
-            params_boards = {"startAt": offset, "maxResults": MAX_RESULTS_AGILE}
-
-            try:
-                rsp_boards = await self.get_raw(endpoint=url_boards, params=params_boards)
-
-                if rsp_boards.status_code == 200:
-                    _brd = rsp_boards.json()
-                    all_boards += _brd["values"]
-                    is_complete = _brd["isLast"]
-                    offset += MAX_RESULTS_AGILE
-
-                else:
-                    raise UserException(
-                        f"Could not download boards.Received: {rsp_boards.status_code} - {rsp_boards.text}."
-                    )
-
-            except httpx.HTTPStatusError as e:
-                raise UserException(
-                    f"Could not download boards. Received: {e.response.status_code} - {e.response.text}."
-                )
+    def iter_all_boards(self):
+        url_boards = urljoin(self.param_agile_url, "board")
 
-        return all_boards
+        return self.paginate(
+            url_boards,
+            MAX_RESULTS_AGILE,
+            lambda js: js["values"],
+            "Could not download boards.",
+            cache_endpoint="boards",
+        )
 
     def get_all_customers(self):
         url_boards = urljoin(self.param_base_url, "board")
@@ -442,7 +514,7 @@ class JiraClient(AsyncHttpClient):
                 rsp_boards = self.get_raw(url=url_boards, params=params_boards)
 
                 if rsp_boards.status_code == 200:
-                    _brd = rsp_boards.json()
+                    _brd = decode_response(rsp_boards)
                     all_boards += _brd["values"]
                     is_complete = _brd["isLast"]
                     offset += MAX_RESULTS_AGILE
@@ -459,17 +531,19 @@ class JiraClient(AsyncHttpClient):
 
         return all_boards
 
-    async def get_custom_jql(self, jql, next_page_token):
+    async def get_custom_jql(self, jql, next_page_token, fields=None, expand_changelog=True):
         url_issues = urljoin(self.param_base_url, "search/jql")
         is_complete = False
 
         params_issues = {
             "jql": jql,
             "maxResults": MAX_RESULTS,
-            "expand": "changelog",
-            "fields": ["*all"]
+            "fields": fields or ["*all"]
         }
 
+        if expand_changelog:
+            params_issues["expand"] = "changelog"
+
         if next_page_token:
             params_issues["nextPageToken"] = next_page_token
 
@@ -477,7 +551,7 @@ class JiraClient(AsyncHttpClient):
             rsp_issues = await self.post_raw(endpoint=url_issues, json=params_issues)
 
             if rsp_issues.status_code == 200:
-                data = rsp_issues.json()
+                data = decode_response(rsp_issues)
                 issues = data["issues"]
 
                 next_token = data.get("nextPageToken")
@@ -499,10 +573,12 @@ class JiraClient(AsyncHttpClient):
             )
 
     async def get_board_sprints(self, board_id):
+        return await self.collect(self.iter_board_sprints(board_id))
+
+    async def iter_board_sprints(self, board_id):
         url_sprints = urljoin(self.param_agile_url, f"board/{board_id}/sprint")
         offset = 0
         is_complete = False
-        all_sprints = []
 
         while is_complete is False:
             params_sprints = {"startAt": offset, "maxResults": MAX_RESULTS_AGILE}
@@ -510,10 +586,10 @@ class JiraClient(AsyncHttpClient):
                 rsp_sprints = await self.get_raw(url_sprints, params=params_sprints)
 
                 if rsp_sprints.status_code == 200:
-                    _sprt = rsp_sprints.json()
-                    all_sprints += _sprt["values"]
+                    _sprt = decode_response(rsp_sprints)
                     is_complete = _sprt["isLast"]
                     offset += MAX_RESULTS_AGILE
+                    yield _sprt["values"]
 
             except httpx.HTTPStatusError as e:
                 if e.response.status_code == 400 and (
@@ -528,46 +604,17 @@ class JiraClient(AsyncHttpClient):
                         f"Received: {e.response.status_code} - {e.response.text}."
                     )
 
-        return all_sprints
-
     async def get_sprint_issues(self, sprint_id, update_date=None):
+        return await self.collect(self.iter_sprint_issues(sprint_id, update_date))
+
+    def iter_sprint_issues(self, sprint_id, update_date=None):
         url_issues = urljoin(self.param_agile_url, f"sprint/{sprint_id}/issue")
         param_jql = f"updated >= {update_date}" if update_date is not None else None
-        is_complete = False
-        offset = 0
-        all_issues = []
-
-        while is_complete is False:
-            params_issues = {
-                "startAt": offset,
-                "maxResults": MAX_RESULTS,
-                "jql": param_jql,
-                "fields": "id,key",
-            }
-
-            try:
-                rsp_issues = await self.get_raw(url_issues, params=params_issues)
-
-                if rsp_issues.status_code == 200:
-                    _iss = rsp_issues.json()["issues"]
-                    all_issues += _iss
 
-                    if len(_iss) < MAX_RESULTS:
-                        is_complete = True
-
-                    else:
-                        offset += MAX_RESULTS
-
-                else:
-                    raise UserException(
-                        f"Could not download issues for sprint {sprint_id}."
-                        f"Received: {rsp_issues.status_code} - {rsp_issues.text}."
-                    )
-
-            except httpx.HTTPStatusError as e:
-                raise UserException(
-                    f"Could not download issues for sprint {sprint_id}."
-                    f"Received: {e.response.status_code} - {e.response.text}."
-                )
-
-        return all_issues
+        return self.paginate(
+            url_issues,
+            MAX_RESULTS,
+            lambda js: js["issues"],
+            f"Could not download issues for sprint {sprint_id}.",
+            params={"jql": param_jql, "fields": "id,key"},
+        )
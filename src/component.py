@@ -1,21 +1,59 @@
-import copy
+import json
 import logging
 import os
 import csv
 import re
 
 import asyncio
+import functools
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
 
 import dateparser
 from keboola.component import ComponentBase, UserException
 from configuration import Configuration
 
+from adf import COMMENT_RENDERER, DESCRIPTION_RENDERER
 from client import JiraClient
-from result import JiraWriter, FIELDS_R_ISSUES, FIELDS_COMMENTS, PK_COMMENTS
+from concurrency import Channel, aenumerate, map_unordered, merge, prefetch
+from issue_cache import IssueRowCache
+from json_codec import DECODER_NAME
+from metrics import Metrics
+from parquet_writer import ParquetWriter
+from scheduler import DatasetScheduler
+from transform import format_issue_page, issue_row, parse_changelogs
+from result import (
+    JiraWriter,
+    FIELDS_COMMENTS,
+    FIELDS_RUN_METRICS,
+    PK_COMMENTS,
+    PK_RUN_METRICS,
+    SEARCH_FIELDS_ISSUES,
+    UNUSED_FIELDS_ISSUES,
+)
 
 KEY_JQL = "jql"
 KEY_TABLE_NAME = "table_name"
 
+# number of search pages downloaded ahead while the previous page is being parsed and written
+ISSUE_PAGES_PREFETCH = 2
+# memory of transformed issues kept to be reused by custom JQL queries returning issues already downloaded in the run
+ISSUE_ROW_CACHE_BYTES = 64 * 2 ** 20
+# issues downloaded by ID in a single search for custom JQL queries
+ISSUE_IDS_PER_SEARCH = 100
+
+KEY_STATE_SINCE = "since"
+KEY_STATE_ISSUES_UPDATED = "issues_updated"
+KEY_STATE_WORKLOGS_UPDATED = "worklogs_updated_until"
+KEY_STATE_WORKLOGS_DELETED = "worklogs_deleted_until"
+
+# incremental runs resume slightly before the stored high-water marks to catch late commits on Jira's side
+STATE_OVERLAP = timedelta(minutes=15)
+JIRA_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f%z"
+JQL_DATETIME_FORMAT = "%Y-%m-%d %H:%M"
+
 
 class JiraComponent(ComponentBase):
     def __init__(self):
@@ -35,73 +73,222 @@ class JiraComponent(ComponentBase):
             self.param_since_date = _parsed_date.strftime("%Y-%m-%d")
             self.param_since_unix = int(_parsed_date.timestamp() * 1000)
 
+        self.metrics = Metrics()
         self.client = JiraClient(
             organization_id=self.cfg.organization_id,
             username=self.cfg.username,
             api_token=self.cfg.pswd_token,
+            max_requests_per_second=self.cfg.max_requests_per_second,
+            max_parallel_requests=self.cfg.max_parallel_requests,
+            cache_directory=self.cfg.http_cache_directory,
+            cache_ttls=self.cfg.http_cache_ttls,
+            metrics=self.metrics,
+        )
+
+        # issues are transformed in worker processes, unless embedded comments have to be read from them as well
+        # or they are written to Parquet, the workers format CSV rows only
+        self.offload_issue_transform = (
+            self.cfg.issue_transform_processes > 0
+            and "issues" in self.cfg.datasets
+            and not (self.cfg.comments_from_issue_search and "comments" in self.cfg.datasets)
+            and not {"issues", "issues-changelogs"} & set(self.cfg.parquet_tables)
         )
+        self.process_pool = None
+
+        # custom JQL queries can only reuse issues if there is another issue download running in parallel, which
+        # keeps the transformed issues in this process
+        issues_in_process = "issues" in self.cfg.datasets and not self.offload_issue_transform
+        self.issue_cache = None
+        if self.cfg.custom_jql and (issues_in_process or len(self.cfg.custom_jql) > 1):
+            self.issue_cache = IssueRowCache(ISSUE_ROW_CACHE_BYTES)
+
+        self.state = self.load_state()
+        self.new_state = {**self.state, KEY_STATE_SINCE: self.cfg.since}
 
     def run(self):
         asyncio.run(self.run_async())
 
     async def run_async(self):
-        stage_1_tasks = []
-        stage_2_tasks = []
-
-        logging.info("Downloading projects.")
-        stage_1_tasks.append(asyncio.create_task(self.get_and_write_projects()))
-
-        logging.info("Downloading a list of fields.")
-        stage_1_tasks.append(asyncio.create_task(self.get_and_write_fields()))
+        scheduler = DatasetScheduler(self.metrics)
 
-        logging.info("Downloading users.")
-        stage_1_tasks.append(asyncio.create_task(self.get_and_write_users()))
+        scheduler.add("projects", self.get_and_write_projects)
+        scheduler.add("fields", self.get_and_write_fields, description="a list of fields")
+        scheduler.add("users", self.get_and_write_users)
 
         self.check_issues_param()
 
+        # finish events of the downloads adding rows to the issue cache, in the order they are scheduled
+        cache_sources = []
+
         if "issues" in self.cfg.datasets:
-            logging.info("Downloading issues.")
-            await self.get_and_write_issues()
+            # comments are downloaded while issues are still being searched, their IDs are passed on page by page,
+            # so the comments do not have to wait for the issues to finish
+            comment_issue_ids = None
+            if "comments" in self.cfg.datasets and not self.cfg.comments_from_issue_search:
+                comment_issue_ids = Channel()
 
-            if "comments" in self.cfg.datasets:
-                logging.info("Downloading comments")
-                stage_1_tasks.append(asyncio.create_task(self.get_and_write_comments()))
+            download_issues = functools.partial(self.get_and_write_issues, comment_issue_ids)
+            if self.issue_cache is not None and not self.offload_issue_transform:
+                download_issues = self.fill_issue_cache(download_issues, cache_sources)
+            scheduler.add("issues", download_issues)
+
+            if comment_issue_ids is not None:
+                scheduler.add("comments", lambda: self.get_and_write_comments(comment_issue_ids))
+
+        if self.cfg.custom_jql:
+            for custom_jql in self.cfg.custom_jql:
+                if not custom_jql.get(KEY_JQL):
+                    raise UserException("Custom JQL error: JQL is empty, must be filled in")
+                if not custom_jql.get(KEY_TABLE_NAME):
+                    raise UserException("Custom JQL error: table name is empty, must be filled in")
 
-        await asyncio.gather(*stage_1_tasks)
+            table_names = [custom_jql.get(KEY_TABLE_NAME) for custom_jql in self.cfg.custom_jql]
+            if duplicates := sorted({name for name in table_names if table_names.count(name) > 1}):
+                raise UserException(
+                    f"Custom JQL error: table names must be unique, duplicated: {', '.join(duplicates)}"
+                )
+
+            for custom_jql in self.cfg.custom_jql:
+                download_custom_jql = functools.partial(
+                    self.get_and_write_custom_jql,
+                    custom_jql.get(KEY_JQL),
+                    custom_jql.get(KEY_TABLE_NAME),
+                    cache_sources=tuple(cache_sources),
+                )
+                if self.issue_cache is not None:
+                    download_custom_jql = self.fill_issue_cache(download_custom_jql, cache_sources)
+                scheduler.add(
+                    f"custom_jql_{custom_jql.get(KEY_TABLE_NAME)}",
+                    download_custom_jql,
+                    description=f"custom JQL : {custom_jql.get(KEY_JQL)}",
+                )
 
         if "boards_n_sprints" in self.cfg.datasets:
-            logging.info("Downloading boards and sprints.")
-            stage_2_tasks.append(asyncio.create_task(self.get_and_write_boards_and_sprints()))
+            scheduler.add("boards_n_sprints", self.get_and_write_boards_and_sprints, description="boards and sprints")
 
         if "worklogs" in self.cfg.datasets:
-            logging.info("Downloading worklogs.")
-            stage_2_tasks.append(asyncio.create_task(self.get_and_write_worklogs()))
+            scheduler.add("worklogs", self.get_and_write_worklogs)
 
         if "organizations" in self.cfg.datasets:
-            logging.info("Downloading organizations.")
-            stage_2_tasks.append(asyncio.create_task(self.get_and_write_organizations()))
+            scheduler.add("organizations", self.get_and_write_organizations)
 
         if "servicedesks_and_customers" in self.cfg.datasets:
-            logging.info("Downloading servicedesks and customers.")
-            stage_2_tasks.append(asyncio.create_task(self.get_and_write_servicedesks_and_customers()))
+            scheduler.add(
+                "servicedesks_and_customers",
+                self.get_and_write_servicedesks_and_customers,
+                description="servicedesks and customers",
+            )
 
-        if self.cfg.custom_jql:
-            for custom_jql in self.cfg.custom_jql:
-                if not custom_jql.get(KEY_JQL):
-                    raise UserException("Custom JQL error: JQL is empty, must be filled in")
-                if not custom_jql.get(KEY_TABLE_NAME):
-                    raise UserException("Custom JQL error: table name is empty, must be filled in")
-                logging.info(f"Downloading custom JQL : {custom_jql.get(KEY_JQL)}")
-                stage_2_tasks.append(
-                    asyncio.create_task(
-                        self.get_and_write_custom_jql(
-                            custom_jql.get(KEY_JQL),
-                            custom_jql.get(KEY_TABLE_NAME)
-                        )
-                    )
-                )
+        if self.offload_issue_transform:
+            self.process_pool = ProcessPoolExecutor(max_workers=self.cfg.issue_transform_processes)
+
+        try:
+            await scheduler.run()
+        finally:
+            if self.process_pool is not None:
+                self.process_pool.shutdown(cancel_futures=True)
 
-        await asyncio.gather(*stage_2_tasks)
+        self.write_performance_report()
+        self.write_state_file(self.new_state)
+
+    def write_performance_report(self):
+        report = self.metrics.report(
+            rate_limiter=self.client.rate_limiter.stats,
+            http_cache=self.client.response_cache.stats if self.client.response_cache else None,
+            issue_cache=self.issue_cache.stats if self.issue_cache else None,
+            json_decoder=DECODER_NAME,
+        )
+        # the full report grows with every endpoint, so only its summary is logged by default
+        throttled = sum(endpoint["throttled_responses"] for endpoint in report["endpoints"].values())
+        logging.info(
+            f"Run finished in {report['elapsed_seconds']:.1f}s: {report['requests']} requests, "
+            f"{report['bytes'] / 2 ** 20:.1f} MiB downloaded, {throttled} throttled responses."
+        )
+        logging.debug(f"Performance report: {json.dumps(report)}")
+
+        if self.cfg.metrics_table:
+            with open(os.path.join(self.tables_out_path, "run-metrics.csv"), mode="w", newline="") as output_file:
+                writer = csv.writer(output_file)
+                for category, name, metric, value in self.metrics.rows():
+                    writer.writerow([report["started"], category, name, metric, value])
+
+            table = self.create_out_table_definition(
+                name="run-metrics.csv",
+                columns=FIELDS_RUN_METRICS,
+                primary_key=PK_RUN_METRICS,
+                incremental=True,
+            )
+            self.write_manifest(table)
+
+    def load_state(self):
+        state = self.get_state_file() or {}
+
+        if not self.cfg.incremental:
+            return {}
+
+        if state.get(KEY_STATE_SINCE) != self.cfg.since:
+            if state:
+                logging.info("Date range changed since the last run, ignoring the stored state.")
+            return {}
+
+        return state
+
+    def get_issues_since(self):
+        last_updated = self.state.get(KEY_STATE_ISSUES_UPDATED)
+        if not last_updated:
+            return self.param_since_date
+
+        # Jira returns timestamps in the timezone of the API user, which is also the timezone JQL dates are
+        # evaluated in, so the wall-clock time can be used as is
+        resume_from = datetime.strptime(last_updated, JIRA_DATETIME_FORMAT) - STATE_OVERLAP
+        return max(resume_from.strftime(JQL_DATETIME_FORMAT), self.param_since_date)
+
+    def get_issue_search_slices(self):
+        """
+        Split the issue date range into disjoint [from, to) windows, each searched with its own cursor.
+        The last window is left open, so issues updated during the run are not missed.
+        """
+        since = self.get_issues_since()
+        start = datetime.strptime(since, JQL_DATETIME_FORMAT if " " in since else "%Y-%m-%d")
+        step = (datetime.now() - start) / max(self.cfg.issue_search_slices, 1)
+
+        bounds = [since]
+        for i in range(1, self.cfg.issue_search_slices):
+            bound = (start + step * i).strftime(JQL_DATETIME_FORMAT)
+            if bound > bounds[-1]:
+                bounds.append(bound)
+
+        return list(zip(bounds, bounds[1:] + [None]))
+
+    def get_worklogs_since(self, state_key):
+        last_until = self.state.get(state_key)
+        if not last_until:
+            return self.param_since_unix
+
+        return max(int(last_until) - int(STATE_OVERLAP.total_seconds() * 1000), self.param_since_unix)
+
+    def update_issues_state(self, issues):
+        last_updated = self.new_state.get(KEY_STATE_ISSUES_UPDATED)
+        last_updated_dt = datetime.strptime(last_updated, JIRA_DATETIME_FORMAT) if last_updated else None
+
+        for issue in issues:
+            updated = issue["fields"].get("updated")
+            if not updated:
+                continue
+
+            updated_dt = datetime.strptime(updated, JIRA_DATETIME_FORMAT)
+            if last_updated_dt is None or updated_dt > last_updated_dt:
+                last_updated, last_updated_dt = updated, updated_dt
+
+        if last_updated:
+            self.new_state[KEY_STATE_ISSUES_UPDATED] = last_updated
+
+    def get_issue_search_fields(self, with_comments=False):
+        # without an explicit list of custom fields all of them are kept, so only the unused system fields are skipped
+        if not self.cfg.issue_custom_fields:
+            return ["*all"] + [f"-{f}" for f in UNUSED_FIELDS_ISSUES if not (with_comments and f == "comment")]
+
+        return SEARCH_FIELDS_ISSUES + (["comment"] if with_comments else []) + self.cfg.issue_custom_fields
 
     def check_issues_param(self):
         if "issues" not in self.cfg.datasets:
@@ -112,19 +299,7 @@ class JiraComponent(ComponentBase):
 
     @staticmethod
     def merge_text_and_mentions(data):
-        merged_string = ""
-
-        content_list = data.get("body", {}).get("content", [])
-
-        for content in content_list:
-            if content.get("type") == "paragraph":
-                for c in content.get("content", []):
-                    if c.get("type") == "text":
-                        merged_string += c.get("text", "")
-                    elif c.get("type") == "mention":
-                        merged_string += c.get("attrs", {}).get("text", "")
-
-        return merged_string
+        return COMMENT_RENDERER.render(data.get("body"))
 
     @staticmethod
     def get_issue_id_from_url(url):
@@ -136,21 +311,19 @@ class JiraComponent(ComponentBase):
         else:
             raise UserException("Cannot find issue_id in response during fetching comments.")
 
-    @staticmethod
-    def get_issue_ids(table_name, table_cols, issue_id_col_name):
-        with open(table_name, "r") as file:
-            r = csv.DictReader(file, fieldnames=table_cols)
-            for row in r:
-                yield row[issue_id_col_name]
-
-    def parse_comments(self, comments) -> list:
+    def parse_comments(self, comments, with_properties=True) -> list:
+        """
+        Args:
+            with_properties: False for comments which were not expanded with properties, such as those embedded in
+                the issue search; their public visibility is unknown and left empty.
+        """
         result = []
         for comment in comments:
             body_text = self.merge_text_and_mentions(comment)
             update_author = comment.get("updateAuthor", {})
             # Check if the comment has properties and parse public visibility if present
-            public_visibility = True
-            if properties := comment.get("properties"):
+            public_visibility = True if with_properties else None
+            if with_properties and (properties := comment.get("properties")):
                 for prop in properties:
                     if prop.get("key") == "sd.public.comment":
                         val = prop.get("value") or {}
@@ -180,24 +353,27 @@ class JiraComponent(ComponentBase):
             )
         return result
 
-    async def get_and_write_comments(self):
-        load_table_name = os.path.join(self.tables_out_path, "issues.csv")
-        issue_id_col_name = "id"
+    async def get_and_write_comments(self, issue_ids):
+        """
+        Args:
+            issue_ids: Channel receiving IDs of downloaded issues; comments are written until the channel is closed.
+        """
+        with self.open_comments_file() as output_file:
+            writer = self.create_comments_writer(output_file)
+            await self.download_and_write_comments(issue_ids, writer)
 
-        issue_ids = set()
-        for issue_id in self.get_issue_ids(load_table_name, FIELDS_R_ISSUES, issue_id_col_name):
-            issue_ids.add(issue_id)
+        self.write_comments_manifest()
 
+    def open_comments_file(self):
         # This is the only table that is being saved in component.py, other tables use JiraWriter. The reason is
         # that I wanted to save both mentions and comments in a single field as sting and this was the easiest way.
-        with open(os.path.join(self.tables_out_path, "comments.csv"), mode="w", newline="") as output_file:
-            writer = csv.DictWriter(output_file, fieldnames=FIELDS_COMMENTS, extrasaction="ignore")
-            for issue_id in issue_ids:
-                issue_comments = await self.client.get_comments(issue_id=issue_id)
-                if issue_comments:
-                    comments = self.parse_comments(issue_comments)
-                    writer.writerows(comments)
+        return open(os.path.join(self.tables_out_path, "comments.csv"), mode="w", newline="")
 
+    @staticmethod
+    def create_comments_writer(output_file):
+        return csv.DictWriter(output_file, fieldnames=FIELDS_COMMENTS, extrasaction="ignore")
+
+    def write_comments_manifest(self):
         table = self.create_out_table_definition(
             name="comments.csv",
             columns=FIELDS_COMMENTS,
@@ -206,257 +382,470 @@ class JiraComponent(ComponentBase):
         )
         self.write_manifest(table)
 
+    async def download_and_write_comments(self, issue_ids, writer):
+        start = time.monotonic()
+        total_comments = 0
+        total_issues = 0
+
+        async for _, issue_comments in map_unordered(self.client.get_comments, issue_ids, self.cfg.max_concurrency):
+            total_issues += 1
+            if issue_comments:
+                total_comments += self.write_comments(issue_comments, writer)
+
+        elapsed = time.monotonic() - start
+        logging.info(
+            f"Downloaded {total_comments} comments for {total_issues} issues in {elapsed:.1f}s "
+            f"({total_issues / max(elapsed, 1e-3):.1f} issues/s, concurrency {self.cfg.max_concurrency})."
+        )
+
+    def write_embedded_comments(self, issues, writer):
+        """
+        Write comments returned as the "comment" field of searched issues.
+        Returns: IDs of issues with more comments than the search returned, which need to be downloaded separately.
+        """
+        truncated_issue_ids = []
+
+        for issue in issues:
+            embedded = issue["fields"].get("comment")
+            if not embedded:
+                continue
+
+            if len(embedded.get("comments", [])) < embedded.get("total", 0):
+                truncated_issue_ids.append(issue["id"])
+            elif embedded.get("comments"):
+                self.write_comments(embedded["comments"], writer, with_properties=False)
+
+        return truncated_issue_ids
+
+    def write_comments(self, issue_comments, writer, with_properties=True):
+        stats = self.metrics.tables["comments"]
+
+        parsing_started = time.perf_counter()
+        comments = self.parse_comments(issue_comments, with_properties)
+        writing_started = time.perf_counter()
+        writer.writerows(comments)
+
+        stats.parse_seconds += writing_started - parsing_started
+        stats.write_seconds += time.perf_counter() - writing_started
+        stats.rows += len(comments)
+        return len(comments)
+
     async def get_and_write_projects(self):
         projects = await self.client.get_projects()
-        wr = JiraWriter(self.tables_out_path, "projects", self.cfg.incremental)
+        wr = self.create_writer("projects")
         wr.writerows(projects)
         wr.close()
 
     async def get_and_write_users(self):
-        users = await self.client.get_users()
-        wr = JiraWriter(self.tables_out_path, "users", self.cfg.incremental)
-        wr.writerows(users)
+        wr = self.create_writer("users")
+        async for users in self.client.iter_users():
+            wr.writerows(users)
         wr.close()
 
     async def get_and_write_fields(self):
         fields = await self.client.get_fields()
-        wr = JiraWriter(self.tables_out_path, "fields", self.cfg.incremental)
+        wr = self.create_writer("fields")
         wr.writerows(fields)
         wr.close()
 
     async def get_and_write_organizations(self):
-        organizations = await self.client.get_organizations()
-        wr = JiraWriter(self.tables_out_path, "organizations", self.cfg.incremental)
-        wr.writerows(organizations)
+        wr = self.create_writer("organizations")
+        async for organizations in self.client.iter_organizations():
+            wr.writerows(organizations)
         wr.close()
 
     async def get_and_write_servicedesks_and_customers(self):
-        organizations = await self.client.get_servicedesks()
-        wr = JiraWriter(self.tables_out_path, "servicedesks", self.cfg.incremental)
-        wr.writerows(organizations)
+        servicedesk_ids = []
+        wr = self.create_writer("servicedesks")
+        async for servicedesks in self.client.iter_servicedesks():
+            wr.writerows(servicedesks)
+            servicedesk_ids += [s["id"] for s in servicedesks]
         wr.close()
 
-        for organization in organizations:
-            customers = await self.client.get_servicedesk_customers(organization["id"])
-            wr = JiraWriter(self.tables_out_path, "servicedesk-customers", self.cfg.incremental)
-            wr.writerows(customers)
-            wr.close()
+        # a customer can belong to several service desks, the table is keyed by accountId only, so every customer
+        # is written once with the service desk of the lowest ID; the desks are downloaded concurrently and finish
+        # in any order, so customers are collected first to keep the choice the same in every run
+        servicedesk_rank = {
+            servicedesk_id: rank
+            for rank, servicedesk_id in enumerate(sorted(servicedesk_ids, key=lambda i: (len(str(i)), str(i))))
+        }
+        customers_by_account = {}
+
+        async def collect_customers(servicedesk_id):
+            async for customers in self.client.iter_servicedesk_customers(servicedesk_id):
+                for customer in customers:
+                    known = customers_by_account.get(customer["accountId"])
+                    if known is None or servicedesk_rank[servicedesk_id] < servicedesk_rank[known["servicedesk_id"]]:
+                        customers_by_account[customer["accountId"]] = {**customer, "servicedesk_id": servicedesk_id}
+
+        async for _ in map_unordered(collect_customers, servicedesk_ids, self.cfg.max_concurrency):
+            pass
 
-    async def get_and_write_worklogs(self, batch_size=1000):
-        _worklogs_u = [w["worklogId"] for w in await self.client.get_updated_worklogs(self.param_since_unix)]
-        total_worklogs = len(_worklogs_u)
+        wr = self.create_writer("servicedesk-customers")
+        wr.writerows(customers_by_account.values())
+        wr.close()
 
-        wr = JiraWriter(self.tables_out_path, "worklogs", self.cfg.incremental)
+    async def get_and_write_worklogs(self):
+        await asyncio.gather(self.get_and_write_updated_worklogs(), self.get_and_write_deleted_worklogs())
 
-        for i in range(0, total_worklogs, batch_size):
-            batch_worklog_ids = _worklogs_u[i: i + batch_size]
-            batch_worklogs = await self.client.get_worklogs(batch_worklog_ids)
+    async def get_and_write_updated_worklogs(self):
+        updated_until = None
+        wr = self.create_writer("worklogs")
 
-            worklogs_out = []
+        # every worklog/updated page holds at most 1000 IDs, which is also the limit of a single worklog/list request,
+        # so each page is hydrated as soon as it arrives while the discovery of IDs continues
+        async def updated_worklog_ids():
+            nonlocal updated_until
+            async for worklogs_updated, updated_until in self.client.iter_updated_worklogs(
+                self.get_worklogs_since(KEY_STATE_WORKLOGS_UPDATED)
+            ):
+                if worklogs_updated:
+                    yield [w["worklogId"] for w in worklogs_updated]
 
-            for w in batch_worklogs:
-                worklogs_out.append(
-                    {
-                        **w,
-                        **{"comment": self.parse_description(w.get("comment", "")).strip("\n")},
-                    }
-                )
+        async def write_worklogs(worklog_ids):
+            async for batch_worklogs in self.client.iter_worklogs(worklog_ids):
+                wr.writerows(self.transform_worklog(w) for w in batch_worklogs)
 
-            wr.writerows(worklogs_out)
+        async for _ in map_unordered(write_worklogs, updated_worklog_ids(), self.cfg.max_concurrency):
+            pass
 
         wr.close()
-
-        worklogs_deleted = await self.client.get_deleted_worklogs(self.param_since_unix)
-        wr = JiraWriter(self.tables_out_path, "worklogs-deleted", self.cfg.incremental)
-        wr.writerows(worklogs_deleted)
+        self.new_state[KEY_STATE_WORKLOGS_UPDATED] = updated_until
+
+    async def get_and_write_deleted_worklogs(self):
+        deleted_until = None
+        wr = self.create_writer("worklogs-deleted")
+        async for worklogs_deleted, deleted_until in self.client.iter_deleted_worklogs(
+            self.get_worklogs_since(KEY_STATE_WORKLOGS_DELETED)
+        ):
+            wr.writerows(worklogs_deleted)
         wr.close()
 
-    def parse_description(self, description) -> str:
-        if description is None:
-            return ""
-        text = ""
-
-        if "content" in description:
-            text += self.parse_description(description["content"])
-
-            if description["type"] == "paragraph":
-                text += "\n"
-
-        elif isinstance(description, dict):
-            if description["type"] == "inlineCard" or description["type"] == "blockCard":
-                text += description.get("attrs", {}).get("url", "")
-            elif description["type"] == "text":
-                text += description.get("text", "")
-            elif description["type"] == "hardBreak":
-                text += "\n"
-            elif description["type"] == "mention":
-                text += description.get("attrs", {}).get("text", "")
-            elif description["type"] == "status":
-                text += description.get("attrs", {}).get("text", "")
-            elif description["type"] in ("codeBlock", "media"):
-                pass
-            else:
-                text += ""
+        self.new_state[KEY_STATE_WORKLOGS_DELETED] = deleted_until
 
-        elif isinstance(description, list):
-            for list_item in description:
-                text += self.parse_description(list_item)
+    def transform_worklog(self, worklog):
+        return {**worklog, **{"comment": self.parse_description(worklog.get("comment", "")).strip("\n")}}
 
-        else:
-            pass
+    @staticmethod
+    def parse_description(description) -> str:
+        return DESCRIPTION_RENDERER.render(description)
+
+    def transform_issues(self, issues):
+        rows = [issue_row(issue) for issue in issues]
 
-        return text
+        if self.issue_cache is not None:
+            for row in rows:
+                self.issue_cache.put(row)
 
-    async def get_and_write_issues(self):
+        return rows
+
+    @staticmethod
+    async def iter_issue_pages(get_page):
         token = None
         is_complete = False
+
+        while is_complete is False:
+            issues, is_complete, token = await get_page(token)
+            yield issues
+
+    async def get_and_write_issues(self, comment_issue_ids=None):
+        """
+        Args:
+            comment_issue_ids: Optional Channel the IDs of written issues are sent to; it is closed once all issues
+                have been downloaded, also when the download fails.
+        """
+        try:
+            await self._get_and_write_issues(comment_issue_ids)
+        finally:
+            if comment_issue_ids is not None:
+                comment_issue_ids.close()
+
+    async def _get_and_write_issues(self, comment_issue_ids):
         download_further_changelogs = []
 
-        writer_issues = JiraWriter(self.tables_out_path, "issues", self.cfg.incremental)
+        writer_issues = self.create_writer("issues")
+
+        with_comments = self.cfg.comments_from_issue_search and "comments" in self.cfg.datasets
+        comments_file, writer_comments = None, None
+        truncated_comments = []
+        if with_comments:
+            comments_file = self.open_comments_file()
+            writer_comments = self.create_comments_writer(comments_file)
 
         writer_changelogs = None
         if "issues_changelogs" in self.cfg.datasets:
-            writer_changelogs = JiraWriter(
-                tableOutPath=self.tables_out_path,
-                tableName='issues-changelogs',
-                incremental=self.cfg.incremental,
-                pk_override=self.cfg.issues_changelog_pk_override,
+            writer_changelogs = self.create_writer(
+                'issues-changelogs', pk_override=self.cfg.issues_changelog_pk_override
             )
 
-        while is_complete is False:
-            issues, is_complete, token = await self.client.get_issues(
-                self.param_since_date,
-                next_page_token=token,
-                issue_jql_filter=self.cfg.issue_jql_filter
+        if self.cfg.issue_search_slices > 1 and not self.cfg.issue_jql_filter:
+            search_slices = self.get_issue_search_slices()
+            logging.info(f"Searching issues in {len(search_slices)} parallel date range slices.")
+        else:
+            search_slices = [(self.get_issues_since(), None)]
+
+        with_changelogs = "issues_changelogs" in self.cfg.datasets
+        loop = asyncio.get_running_loop()
+
+        def slice_pages(date_from, date_to):
+            search = dict(
+                issue_jql_filter=self.cfg.issue_jql_filter,
+                update_date_to=date_to,
+                fields=self.get_issue_search_fields(with_comments=with_comments),
+                expand_changelog=with_changelogs,
             )
-            issues_f = []
 
-            for issue in issues:
-                _out = {"id": issue["id"], "key": issue["key"]}
+            async def get_page(token):
+                if not self.offload_issue_transform:
+                    return await self.client.get_issues(date_from, next_page_token=token, **search)
 
-                _custom = {}
+                # the raw page is decoded, transformed and formatted to CSV in a worker process
+                content = await self.client.get_issues_raw(date_from, next_page_token=token, **search)
+                page = await loop.run_in_executor(self.process_pool, format_issue_page, content, with_changelogs)
+                return page, page.is_complete, page.next_token
 
-                for key, value in issue["fields"].items():
-                    if "customfield_" in key:
-                        _custom[key] = value
-                    elif key == "description":
-                        _out["description"] = (
-                            self.parse_description(issue["fields"]["description"]).strip("\n").replace("\0", "\\0")
-                        )
-                    else:
-                        _out[key] = value
+            return self.iter_issue_pages(get_page)
+
+        # an issue updated during the run can move into a later slice, so it may be returned twice
+        seen_issue_ids = set() if len(search_slices) > 1 else None
+        pages = merge(
+            [slice_pages(date_from, date_to) for date_from, date_to in search_slices],
+            ISSUE_PAGES_PREFETCH * len(search_slices),
+            self.cfg.max_concurrency,
+        )
+
+        async for issues in pages:
+            # formatted pages only carry the id, key and update time of their issues
+            page = None
+            if self.offload_issue_transform:
+                page, issues = issues, issues.issues
+
+            if seen_issue_ids is not None:
+                is_new = [i["id"] not in seen_issue_ids for i in issues]
+                seen_issue_ids.update(i["id"] for i in issues)
+                issues = list(itertools.compress(issues, is_new))
+                if page is not None:
+                    page = page.select(is_new)
+
+            if not self.cfg.issue_jql_filter:
+                self.update_issues_state(issues)
+
+            if page is not None:
+                writer_issues.write_csv("".join(page.issue_rows), len(page.issue_rows))
+                writer_issues.stats.parse_seconds += page.seconds
+            else:
+                writer_issues.write_table_rows(self.transform_issues(issues))
+
+            if comment_issue_ids is not None:
+                for issue in issues:
+                    comment_issue_ids.send(issue["id"])
 
-                _out["custom_fields"] = _custom
-                issues_f += [copy.deepcopy(_out)]
+            if with_comments:
+                truncated_comments += self.write_embedded_comments(issues, writer_comments)
 
-                if "issues_changelogs" in self.cfg.datasets:
+            if with_changelogs and page is not None:
+                writer_changelogs.write_csv("".join(page.changelog_rows), sum(page.changelog_counts))
+                download_further_changelogs += page.truncated_changelogs
+
+            elif with_changelogs:
+                for issue in issues:
                     _changelog = issue["changelog"]
 
                     if _changelog["maxResults"] < _changelog["total"]:
                         download_further_changelogs += [(issue["id"], issue["key"])]
 
                     else:
-                        all_changelogs = []
-                        _changelogs = [
-                            {
-                                **x,
-                                **{"issue_id": issue["id"], "issue_key": issue["key"]},
-                            }
-                            for x in _changelog["histories"]
-                        ]
-
-                        for changelog in _changelogs:
-                            _out = dict()
-                            _out["total_changed_items"] = len(changelog["items"])
-                            _out["id"] = changelog["id"]
-                            _out["issue_id"] = changelog["issue_id"]
-                            _out["issue_key"] = changelog["issue_key"]
-                            _out["author_accountId"] = changelog.get("author", {}).get("accountId", "")
-                            _out["author_emailAddress"] = changelog.get("author", {}).get("emailAddress", "")
-                            _out["created"] = changelog["created"]
-
-                            for idx, item in enumerate(changelog["items"], start=1):
-                                item["changed_item_order"] = idx
-                                all_changelogs += [{**_out, **item}]
-
-                        writer_changelogs.writerows(all_changelogs)
-
-            writer_issues.writerows(issues_f)
+                        writer_changelogs.writerows(
+                            parse_changelogs(_changelog["histories"], issue["id"], issue["key"])
+                        )
 
         writer_issues.close()
 
-        for issue in download_further_changelogs:
-            all_changelogs = []
-            _changelogs = [
-                {**c, **{"issue_id": issue[0], "issue_key": issue[1]}}
-                for c in await self.client.get_changelogs(issue[1])
-            ]
+        if with_comments:
+            logging.info(f"Downloading comments of {len(truncated_comments)} issues with truncated comment lists.")
+            await self.download_and_write_comments(truncated_comments, writer_comments)
+            comments_file.close()
+            self.write_comments_manifest()
 
-            for changelog in _changelogs:
-                _out = dict()
-                _out["total_changed_items"] = len(changelog["items"])
-                _out["id"] = changelog["id"]
-                _out["issue_id"] = changelog["issue_id"]
-                _out["issue_key"] = changelog["issue_key"]
-                _out["author_accountId"] = changelog.get("author", {}).get("accountId", "")
-                _out["author_emailAddress"] = changelog.get("author", {}).get("emailAddress", "")
-                _out["created"] = changelog["created"]
-
-                for idx, item in enumerate(changelog["items"], start=1):
-                    item["changed_item_order"] = idx
-                    all_changelogs += [{**_out, **item}]
-
-            writer_changelogs.writerows(all_changelogs)
         if writer_changelogs:
+            await self.backfill_changelogs(download_further_changelogs, writer_changelogs)
             writer_changelogs.close()
 
+    async def backfill_changelogs(self, issues, writer_changelogs):
+        start = time.monotonic()
+
+        async def write_issue_changelogs(issue):
+            async for changelogs in self.client.iter_changelogs(issue[1], concurrency=self.cfg.max_concurrency):
+                writer_changelogs.writerows(parse_changelogs(changelogs, issue[0], issue[1]))
+
+        async for _ in map_unordered(write_issue_changelogs, issues, self.cfg.max_concurrency):
+            pass
+
+        if issues:
+            logging.info(
+                f"Downloaded full changelogs for {len(issues)} issues in {time.monotonic() - start:.1f}s."
+            )
+
     async def get_and_write_boards_and_sprints(self):
-        boards = await self.client.get_all_boards()
-        _boards = [b["id"] for b in boards]
-        JiraWriter(self.tables_out_path, "boards", self.cfg.incremental).writerows(boards)
-
-        sprint_writer = JiraWriter(self.tables_out_path, "sprints", self.cfg.incremental)
-        all_sprints = []
-        for board in _boards:
-            sprints = await self.client.get_board_sprints(board)
-            all_sprints += [
-                s["id"] for s in sprints if s.get("completeDate", self.param_since_date) >= self.param_since_date
-            ]
-            sprints = [{**s, **{"board_id": board}} for s in sprints]
-            sprint_writer.writerows(sprints)
+        _boards = []
+        boards_writer = self.create_writer("boards")
+        async for boards in self.client.iter_all_boards():
+            boards_writer.writerows(boards)
+            # kanban boards never have sprints, asking for them would only return an error
+            _boards += [b["id"] for b in boards if b.get("type") != "kanban"]
+        boards_writer.close()
+
+        sprint_writer = self.create_writer("sprints")
+        all_sprints = set()
+
+        async def write_board_sprints(board):
+            total_sprints = 0
+            async for sprints in self.client.iter_board_sprints(board):
+                all_sprints.update(
+                    s["id"] for s in sprints if s.get("completeDate", self.param_since_date) >= self.param_since_date
+                )
+                sprint_writer.writerows({**s, **{"board_id": board}} for s in sprints)
+                total_sprints += len(sprints)
+            return total_sprints
+
+        async for idx, (board, total_sprints) in aenumerate(
+            map_unordered(write_board_sprints, _boards, self.cfg.max_concurrency), start=1
+        ):
+            logging.debug(f"Downloaded {total_sprints} sprints for board {board} ({idx}/{len(_boards)}).")
+            self.log_progress("boards", idx, len(_boards))
         sprint_writer.close()
 
-        issues_writer = JiraWriter(self.tables_out_path, "sprints-issues", self.cfg.incremental)
-        for sprint in set(all_sprints):
-            issues = await self.client.get_sprint_issues(sprint, update_date=self.param_since_date)
-            issues = [{**i, **{"sprint_id": sprint}} for i in issues]
-            issues_writer.writerows(issues)
+        issues_writer = self.create_writer("sprints-issues")
+
+        async def write_sprint_issues(sprint):
+            total_issues = 0
+            async for issues in self.client.iter_sprint_issues(sprint, update_date=self.param_since_date):
+                issues_writer.writerows({**i, **{"sprint_id": sprint}} for i in issues)
+                total_issues += len(issues)
+            return total_issues
+
+        async for idx, (sprint, total_issues) in aenumerate(
+            map_unordered(write_sprint_issues, all_sprints, self.cfg.max_concurrency), start=1
+        ):
+            logging.debug(f"Downloaded {total_issues} issues for sprint {sprint} ({idx}/{len(all_sprints)}).")
+            self.log_progress("sprints", idx, len(all_sprints))
         issues_writer.close()
 
-    async def get_and_write_custom_jql(self, jql, table_name):
-        token = None
-        is_complete = False
-        writer_issues = JiraWriter(self.tables_out_path, "issues", self.cfg.incremental, custom_name=table_name)
+    def create_writer(self, table_name, custom_name="", pk_override=None):
+        """Create the writer of a table, a Parquet one if the table is configured in `parquet_tables`."""
+        if (custom_name or table_name) in self.cfg.parquet_tables:
+            return ParquetWriter(
+                self.files_out_path, table_name, self.cfg.incremental, custom_name=custom_name,
+                pk_override=pk_override, metrics=self.metrics,
+            )
 
-        while is_complete is False:
-            issues, is_complete, token = await self.client.get_custom_jql(jql, next_page_token=token)
-            issues_f = []
-            for issue in issues:
-                _out = {"id": issue["id"], "key": issue["key"]}
-                _custom = {}
-                for key, value in issue["fields"].items():
-                    if "customfield_" in key:
-                        _custom[key] = value
-                    elif key == "description":
-                        _out["description"] = self.parse_description(issue["fields"]["description"]).strip("\n")
-                    else:
-                        _out[key] = value
+        return JiraWriter(
+            self.tables_out_path, table_name, self.cfg.incremental, custom_name=custom_name,
+            pk_override=pk_override, metrics=self.metrics,
+        )
+
+    @staticmethod
+    def log_progress(name, done, total, step=100):
+        if done % step == 0 or done == total:
+            logging.info(f"Processed {done}/{total} {name}.")
+
+    @staticmethod
+    def fill_issue_cache(download, cache_sources):
+        """
+        Register a download adding rows to the issue cache in `cache_sources`; the event is set once it finishes.
+        Returns: Function starting the download.
+        """
+        finished = asyncio.Event()
+        cache_sources.append(finished)
+
+        async def run():
+            try:
+                await download()
+            finally:
+                finished.set()
+
+        return run
+
+    async def get_and_write_custom_jql(self, jql, table_name, cache_sources=()):
+        """
+        Args:
+            cache_sources: Finish events of the downloads started before this query, whose issues it can reuse from
+                the issue cache.
+        """
+        writer_issues = self.create_writer("issues", custom_name=table_name)
+
+        # with the issue cache and earlier downloads running, the query only lists IDs with their update time and full
+        # issues are downloaded only for those not downloaded by the other downloads
+        reuse_issues = self.issue_cache is not None and bool(cache_sources)
+        search_fields = ["updated"] if reuse_issues else self.get_issue_search_fields()
+
+        async def get_page(token):
+            return await self.client.get_custom_jql(
+                jql, next_page_token=token, fields=search_fields, expand_changelog=False
+            )
+
+        missing_issues = []
+        async for issues in prefetch(self.iter_issue_pages(get_page), ISSUE_PAGES_PREFETCH):
+            if not reuse_issues:
+                writer_issues.write_table_rows(self.transform_issues(issues))
+                continue
+
+            rows, missing = self.get_cached_issue_rows(
+                ((i["id"], i["fields"].get("updated")) for i in issues), count_misses=False
+            )
+            writer_issues.write_table_rows(rows)
+            missing_issues += missing
+
+        if missing_issues:
+            # issues the other downloads have not reached yet are likely still to come, so they are looked up again
+            # once those finish and only the rest is downloaded, instead of downloading them twice
+            await asyncio.gather(*(finished.wait() for finished in cache_sources))
+            rows, missing_issues = self.get_cached_issue_rows(missing_issues)
+            writer_issues.write_table_rows(rows)
+
+            logging.info(f"Downloading {len(missing_issues)} issues of custom JQL {table_name} not found in the run.")
+            batches = [
+                [issue_id for issue_id, _ in missing_issues[i:i + ISSUE_IDS_PER_SEARCH]]
+                for i in range(0, len(missing_issues), ISSUE_IDS_PER_SEARCH)
+            ]
+            async for _, rows in map_unordered(self.get_issue_rows_by_id, batches, self.cfg.max_concurrency):
+                writer_issues.write_table_rows(rows)
 
-                _out["custom_fields"] = _custom
-                issues_f += [copy.deepcopy(_out)]
-            writer_issues.writerows(issues_f)
         writer_issues.close()
 
+    def get_cached_issue_rows(self, issues, count_misses=True):
+        """
+        Args:
+            issues: (issue ID, update time) pairs.
+            count_misses: False if the issues not found are looked up again later.
+        Returns: Cached rows of the issues and the pairs not found in the cache.
+        """
+        rows, missing = [], []
+
+        for issue_id, updated in issues:
+            row = self.issue_cache.get(issue_id, updated, count_misses)
+            if row is not None:
+                rows.append(row)
+            else:
+                missing.append((issue_id, updated))
+
+        return rows, missing
+
+    async def get_issue_rows_by_id(self, issue_ids):
+        async def get_page(token):
+            return await self.client.get_custom_jql(
+                f"id in ({', '.join(issue_ids)})",
+                next_page_token=token,
+                fields=self.get_issue_search_fields(),
+                expand_changelog=False,
+            )
+
+        rows = []
+        async for issues in self.iter_issue_pages(get_page):
+            rows += self.transform_issues(issues)
+
+        return rows
+
 
 if __name__ == "__main__":
     try:
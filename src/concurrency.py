@@ -0,0 +1,182 @@
+import asyncio
+import contextlib
+import itertools
+
+_END = object()
+
+
+async def map_unordered(func, items, concurrency):
+    """
+    Run an async function over items with at most `concurrency` calls in flight.
+    Args:
+        func: Coroutine function called with a single item.
+        items: Iterable or async iterable of items; consumed lazily, only when a call slot is free.
+        concurrency: Maximum number of calls running at the same time.
+
+    Yields: (item, result) tuples in the order the calls finish.
+
+    """
+    if hasattr(items, "__aiter__"):
+        # closed explicitly, so its calls are cancelled as soon as this generator is, not once it is garbage collected
+        async with contextlib.aclosing(_map_unordered_async(func, items, concurrency)) as results:
+            async for result in results:
+                yield result
+        return
+
+    iterator = iter(items)
+    pending = {}
+
+    def fill():
+        for item in itertools.islice(iterator, max(concurrency, 1) - len(pending)):
+            pending[asyncio.create_task(func(item))] = item
+
+    try:
+        fill()
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                item = pending.pop(task)
+                yield item, task.result()
+            fill()
+    finally:
+        # cancelled tasks and exceptions of tasks which have finished are collected, so none is left unretrieved
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _map_unordered_async(func, items, concurrency):
+    # the next item is awaited in its own task, so calls already running are not blocked by a slow source
+    iterator = aiter(items)
+    pending = {}
+    next_item = None
+    exhausted = False
+
+    try:
+        while True:
+            if not exhausted and next_item is None and len(pending) < max(concurrency, 1):
+                next_item = asyncio.ensure_future(anext(iterator))
+
+            waiting = set(pending)
+            if next_item is not None:
+                waiting.add(next_item)
+            if not waiting:
+                break
+
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+            if next_item in done:
+                try:
+                    item = next_item.result()
+                except StopAsyncIteration:
+                    exhausted = True
+                else:
+                    pending[asyncio.create_task(func(item))] = item
+                next_item = None
+
+            for task in done:
+                if task in pending:
+                    item = pending.pop(task)
+                    yield item, task.result()
+    finally:
+        tasks = [*pending, *([next_item] if next_item is not None else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def prefetch(iterator, depth):
+    """
+    Consume an async iterator in a background task, keeping at most `depth` items buffered ahead.
+    Args:
+        iterator: Async iterator to read from.
+        depth: Maximum number of items waiting in the buffer.
+
+    Yields: Items of the iterator in their original order.
+
+    """
+    async with contextlib.aclosing(merge([iterator], depth, 1)) as items:
+        async for item in items:
+            yield item
+
+
+async def merge(iterators, depth, concurrency):
+    """
+    Consume several async iterators in background tasks and yield their items through one bounded buffer.
+    Args:
+        iterators: Async iterators to read from.
+        depth: Maximum number of items waiting in the buffer.
+        concurrency: Maximum number of iterators being read at the same time.
+
+    Yields: Items of all iterators as they arrive; items of a single iterator keep their order.
+
+    """
+    queue = asyncio.Queue(maxsize=max(depth, 1))
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def produce(iterator):
+        # the iterator is closed also when the producer is cancelled, so it does not wait for garbage collection
+        closing = contextlib.aclosing(iterator) if hasattr(iterator, "aclose") else contextlib.nullcontext(iterator)
+        async with closing, semaphore:
+            async for item in iterator:
+                await queue.put((item, None))
+
+    async def produce_all():
+        try:
+            async with asyncio.TaskGroup() as group:
+                for iterator in iterators:
+                    group.create_task(produce(iterator))
+        except ExceptionGroup as e:
+            await queue.put((None, e.exceptions[0]))
+        else:
+            await queue.put((_END, None))
+
+    producer = asyncio.create_task(produce_all())
+
+    try:
+        while True:
+            item, error = await queue.get()
+            if error is not None:
+                raise error
+            if item is _END:
+                break
+            yield item
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+
+class Channel:
+    """
+    Unbounded in-memory channel passing items from one task to a consumer iterating it with `async for`.
+    Sending never blocks, so a producer is never slowed down by its consumer; iteration ends once the channel
+    is closed and all items sent before have been consumed.
+    """
+
+    def __init__(self):
+        self._queue = asyncio.Queue()
+        self.closed = False
+
+    def send(self, item):
+        if self.closed:
+            raise RuntimeError("Cannot send to a closed channel.")
+        self._queue.put_nowait(item)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._queue.put_nowait(_END)
+
+    async def __aiter__(self):
+        while True:
+            item = await self._queue.get()
+            if item is _END:
+                return
+            yield item
+
+
+async def aenumerate(iterator, start=0):
+    idx = start
+    async for item in iterator:
+        yield idx, item
+        idx += 1
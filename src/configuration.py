@@ -57,3 +57,14 @@ class Configuration(ConfigurationBase):
     organization_id: str = ""
     organization_url: str = ""
     issues_changelog_pk_override: List[str] = field(default_factory=list)
+    max_concurrency: int = 10
+    max_requests_per_second: float = 0
+    max_parallel_requests: int = 30
+    issue_search_slices: int = 1
+    issue_custom_fields: List[str] = field(default_factory=list)
+    comments_from_issue_search: bool = False
+    http_cache_directory: str = ""
+    http_cache_ttls: Dict[str, int] = field(default_factory=dict)
+    metrics_table: bool = False
+    issue_transform_processes: int = 0
+    parquet_tables: List[str] = field(default_factory=list)
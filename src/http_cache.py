@@ -0,0 +1,103 @@
+import hashlib
+import json
+import logging
+import os
+import time
+
+import httpx
+
+# seconds a cached response is used without asking the server; after that it is revalidated with a conditional request
+DEFAULT_TTLS = {
+    "projects": 24 * 3600,
+    "fields": 24 * 3600,
+    "users": 6 * 3600,
+    "boards": 6 * 3600,
+    "servicedesks": 24 * 3600,
+}
+
+# response headers kept with the cached body
+STORED_HEADERS = ["content-type", "etag", "last-modified"]
+
+
+class ResponseCache:
+    """
+    Persistent cache of GET responses stored in a directory which is kept between runs.
+    Every entry is a body file and a JSON file with its validators (ETag, Last-Modified) and the time it was stored.
+    Entries younger than the TTL of their endpoint are served without a request, older ones are revalidated.
+    """
+
+    def __init__(self, directory, namespace="", ttls=None):
+        self.directory = directory
+        self.namespace = namespace
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, url, params=None, headers=None):
+        # the namespace keeps responses of different accounts apart, as they may see different data
+        raw = json.dumps([self.namespace, url, sorted((params or {}).items()), sorted((headers or {}).items())])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key):
+        try:
+            with open(self._meta_path(key)) as meta_file:
+                meta = json.load(meta_file)
+            with open(self._body_path(key), "rb") as body_file:
+                body = body_file.read()
+        except (OSError, ValueError):
+            return None
+
+        return meta, body
+
+    def is_fresh(self, meta, endpoint):
+        return time.time() - meta["stored_at"] < self.ttls.get(endpoint, 0)
+
+    @staticmethod
+    def conditional_headers(meta):
+        headers = {}
+        if meta["headers"].get("etag"):
+            headers["If-None-Match"] = meta["headers"]["etag"]
+        if meta["headers"].get("last-modified"):
+            headers["If-Modified-Since"] = meta["headers"]["last-modified"]
+        return headers
+
+    def store(self, key, response):
+        meta = {
+            "url": str(response.request.url),
+            "stored_at": time.time(),
+            "headers": {h: response.headers[h] for h in STORED_HEADERS if h in response.headers},
+        }
+        self._write(self._body_path(key), response.content)
+        self._write(self._meta_path(key), json.dumps(meta).encode())
+
+    def touch(self, key, meta):
+        """Mark an entry confirmed by a 304 response as fresh again."""
+        self._write(self._meta_path(key), json.dumps({**meta, "stored_at": time.time()}).encode())
+
+    @staticmethod
+    def to_response(meta, body, request):
+        return httpx.Response(200, headers=meta["headers"], content=body, request=request)
+
+    @property
+    def stats(self):
+        return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses}
+
+    def _write(self, path, content):
+        # written to a temporary file first, so an interrupted run never leaves a truncated entry behind
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as file:
+                file.write(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Could not store a response in the HTTP cache: {e}")
+
+    def _meta_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _body_path(self, key):
+        return os.path.join(self.directory, f"{key}.body")
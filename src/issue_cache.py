@@ -0,0 +1,66 @@
+import sys
+from collections import OrderedDict
+
+
+class IssueRowCache:
+    """
+    In-run cache of transformed issue rows keyed by issue ID, shared by the issue download and custom JQL queries.
+    A row is only served while its "updated" timestamp matches the one seen by the caller, so an issue changed
+    during the run is downloaded again. The least recently used rows are dropped once the rows take more than
+    `max_bytes` of memory.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.rows = OrderedDict()
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    @staticmethod
+    def row_size(row):
+        # rows are flat dicts of strings and scalars, so their shallow sizes add up to the memory they hold
+        return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+
+    def put(self, row):
+        size = self.row_size(row)
+        if size > self.max_bytes:
+            return
+
+        if (previous := self.rows.pop(row["id"], None)) is not None:
+            self.size -= previous[1]
+
+        self.rows[row["id"]] = (row, size)
+        self.size += size
+
+        while self.size > self.max_bytes:
+            _, (_, evicted_size) = self.rows.popitem(last=False)
+            self.size -= evicted_size
+            self.evicted += 1
+
+    def get(self, issue_id, updated, count_miss=True):
+        """
+        Args:
+            count_miss: False for a lookup which is repeated later if it misses, so the miss is counted only once.
+        """
+        row, _ = self.rows.get(issue_id, (None, 0))
+
+        if row is None or row.get("updated") != updated:
+            self.misses += count_miss
+            return None
+
+        self.rows.move_to_end(issue_id)
+        self.hits += 1
+        return row
+
+    @property
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+            "size": len(self.rows),
+            "bytes": self.size,
+        }
@@ -0,0 +1,42 @@
+# Decoding of Jira API responses. A fast decoder is used when one is installed (orjson, then msgspec), otherwise
+# the standard library one. All of them return the same plain Python objects.
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _select_decoder():
+    if orjson is not None:
+        return "orjson", orjson.loads
+
+    if msgspec is not None:
+        return "msgspec", msgspec.json.Decoder().decode
+
+    return "json", json.loads
+
+
+DECODER_NAME, _decode = _select_decoder()
+
+
+def decode_json(content):
+    """Decode a JSON document given as bytes or str."""
+    try:
+        return _decode(content)
+    except Exception:
+        # the fast decoders are stricter in a few edge cases, e.g. integers beyond 64 bits
+        if _decode is json.loads:
+            raise
+        return json.loads(content)
+
+
+def decode_response(response):
+    """Decode the body of a httpx response, a faster equivalent of response.json()."""
+    return decode_json(response.content)
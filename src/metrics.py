@@ -0,0 +1,147 @@
+import re
+import time
+from collections import defaultdict
+
+# upper bounds of latency histogram buckets in seconds, the last bucket collects everything slower
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+RETRIED_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# path segments with digits, other than API versions, are IDs or keys (e.g. 10010, PROJ-12); they are replaced to
+# group requests by endpoint
+_ID_SEGMENT = re.compile(r"(?<!/rest/api)(?<!/rest/agile)/[^/]*\d[^/]*(?=/|$)")
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self):
+        count = sum(self.counts)
+        labels = [f"<={bound}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+        return {
+            "mean_seconds": round(self.total / count, 4) if count else 0.0,
+            "max_seconds": round(self.max, 4),
+            "buckets": {label: n for label, n in zip(labels, self.counts) if n},
+        }
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.responses = 0
+        self.bytes = 0
+        self.status_codes = defaultdict(int)
+        self.latency = LatencyHistogram()
+
+    def to_dict(self):
+        return {
+            "requests": self.requests,
+            # requests without a response failed on the transport level (timeouts, connection errors)
+            "failed_requests": self.requests - self.responses,
+            "retried_responses": sum(n for code, n in self.status_codes.items() if code in RETRIED_STATUS_CODES),
+            "throttled_responses": self.status_codes.get(429, 0),
+            "bytes": self.bytes,
+            "status_codes": dict(sorted(self.status_codes.items())),
+            "latency": self.latency.to_dict(),
+        }
+
+
+class TableMetrics:
+    def __init__(self):
+        self.rows = 0
+        self.parse_seconds = 0.0
+        self.flatten_seconds = 0.0
+        self.write_seconds = 0.0
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "parse_seconds": round(self.parse_seconds, 3),
+            "flatten_seconds": round(self.flatten_seconds, 3),
+            "write_seconds": round(self.write_seconds, 3),
+        }
+
+
+class Metrics:
+    """
+    Counters of a single run: HTTP requests per endpoint, wall time per dataset and rows and processing time per
+    output table. Requests are recorded by httpx event hooks, see `request_hook` and `response_hook`.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.endpoints = defaultdict(EndpointMetrics)
+        self.datasets = {}
+        self.tables = defaultdict(TableMetrics)
+
+    @staticmethod
+    def endpoint_name(request):
+        return f"{request.method} {_ID_SEGMENT.sub('/{id}', request.url.path)}"
+
+    async def request_hook(self, request):
+        request.extensions["metrics_start"] = time.perf_counter()
+        self.endpoints[self.endpoint_name(request)].requests += 1
+
+    async def response_hook(self, response):
+        # the body is read here so that the latency includes its download and the size is known
+        await response.aread()
+
+        endpoint = self.endpoints[self.endpoint_name(response.request)]
+        endpoint.responses += 1
+        endpoint.bytes += len(response.content)
+        endpoint.status_codes[response.status_code] += 1
+
+        start = response.request.extensions.get("metrics_start")
+        if start is not None:
+            endpoint.latency.add(time.perf_counter() - start)
+
+    async def timed(self, dataset, coroutine):
+        """Await a coroutine and record its wall time under the dataset name."""
+        start = time.monotonic()
+        try:
+            return await coroutine
+        finally:
+            self.datasets[dataset] = self.datasets.get(dataset, 0.0) + time.monotonic() - start
+
+    def report(self, **extra):
+        endpoints = {name: m.to_dict() for name, m in sorted(self.endpoints.items())}
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started)),
+            "elapsed_seconds": round(time.time() - self.started, 3),
+            "requests": sum(m["requests"] for m in endpoints.values()),
+            "bytes": sum(m["bytes"] for m in endpoints.values()),
+            "endpoints": endpoints,
+            "datasets": {name: round(seconds, 3) for name, seconds in sorted(self.datasets.items())},
+            "tables": {name: m.to_dict() for name, m in sorted(self.tables.items())},
+            **extra,
+        }
+
+    def rows(self):
+        """The report flattened to (category, name, metric, value) rows of the metrics table."""
+        report = self.report()
+
+        for name, endpoint in report["endpoints"].items():
+            for metric in ["requests", "failed_requests", "retried_responses", "throttled_responses", "bytes"]:
+                yield "endpoint", name, metric, endpoint[metric]
+            yield "endpoint", name, "latency_mean_seconds", endpoint["latency"]["mean_seconds"]
+            yield "endpoint", name, "latency_max_seconds", endpoint["latency"]["max_seconds"]
+
+        for name, seconds in report["datasets"].items():
+            yield "dataset", name, "seconds", seconds
+
+        for name, table in report["tables"].items():
+            for metric, value in table.items():
+                yield "table", name, metric, value
@@ -0,0 +1,242 @@
+# Parquet output of tables, an alternative to the CSV files written by JiraWriter. It needs pyarrow from the optional
+# "parquet" extra, which is only imported when a Parquet table is configured.
+import json
+import logging
+import os
+import time
+from datetime import date, datetime
+
+from keboola.component import UserException
+
+from metrics import TableMetrics
+from result import TABLE_SCHEMAS
+
+# rows buffered in memory before they are written to the file as one row group
+ROW_GROUP_SIZE = 100000
+
+# typed columns of each table by their field name; all other columns are strings, as in the CSV files
+COLUMN_TYPES = {
+    "issues": {
+        "statuscategorychangedate": "timestamp",
+        "timespent": "int",
+        "aggregatetimespent": "int",
+        "resolutiondate": "timestamp",
+        "workratio": "int",
+        "lastViewed": "timestamp",
+        "created": "timestamp",
+        "timeestimate": "int",
+        "aggregatetimeoriginalestimate": "int",
+        "updated": "timestamp",
+        "timeoriginalestimate": "int",
+        "aggregatetimeestimate": "int",
+        "aggregateprogress_progress": "int",
+        "aggregateprogress_total": "int",
+        "duedate": "date",
+        "progress_progress": "int",
+        "progress_total": "int",
+    },
+    "issues-changelogs": {
+        "created": "timestamp",
+        "total_changed_items": "int",
+        "changed_item_order": "int",
+    },
+    "worklogs": {
+        "created": "timestamp",
+        "updated": "timestamp",
+        "started": "timestamp",
+        "timeSpentSeconds": "int",
+    },
+    "worklogs-deleted": {
+        "worklogId": "int",
+        "updatedTime": "int",
+    },
+    "users": {"active": "bool"},
+    "fields": {"custom": "bool"},
+    "projects": {"isPrivate": "bool", "archived": "bool"},
+    "sprints": {
+        "startDate": "timestamp",
+        "endDate": "timestamp",
+        "completeDate": "timestamp",
+    },
+    "servicedesk-customers": {"active": "bool"},
+}
+
+
+def _to_timestamp(value):
+    return datetime.fromisoformat(value)
+
+
+def _to_date(value):
+    return date.fromisoformat(value)
+
+
+def _to_int(value):
+    return int(value)
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    return {"true": True, "false": False}[str(value).lower()]
+
+
+def _to_string(value):
+    return value if isinstance(value, str) else str(value)
+
+
+_CONVERTERS = {
+    "timestamp": _to_timestamp,
+    "date": _to_date,
+    "int": _to_int,
+    "bool": _to_bool,
+    "string": _to_string,
+}
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise UserException(
+            "Parquet output requires the pyarrow package, which is not installed. Install the parquet extra."
+        )
+
+    return pyarrow, pyarrow.parquet
+
+
+class ParquetWriter:
+    """
+    Writes a table to a Parquet file in out/files, with the same columns as its CSV file and typed columns for
+    timestamps, numbers and flags. Rows are written in row groups of ROW_GROUP_SIZE, so a table is never held in
+    memory as a whole. Has the same interface as JiraWriter.
+
+    Storage loads tables from CSV only, so the file is stored as a permanent Storage file instead of a table. The
+    primary key and whether the file holds only the rows changed since the last run, which JiraWriter puts in the
+    table manifest, are kept in the metadata of the Parquet schema.
+    """
+
+    def __init__(self, fileOutPath, tableName, incremental, custom_name="", pk_override=None, metrics=None):
+        pa, pq = _import_pyarrow()
+
+        self.schema = TABLE_SCHEMAS[tableName]
+        self.paramTableName = custom_name or tableName
+        self.paramPrimaryKey = list(pk_override or self.schema.primary_key)
+        self.paramIncremental = incremental
+        self.paramFilePath = os.path.join(fileOutPath, self.paramTableName + ".parquet")
+        self.stats = metrics.tables[self.paramTableName] if metrics is not None else TableMetrics()
+
+        column_types = COLUMN_TYPES.get(tableName, {})
+        arrow_types = {
+            "timestamp": pa.timestamp("ms", tz="UTC"),
+            "date": pa.date32(),
+            "int": pa.int64(),
+            "bool": pa.bool_(),
+            "string": pa.string(),
+        }
+        self.types = [column_types.get(f, "string") for f in self.schema.fields]
+        self.converters = [_CONVERTERS[t] for t in self.types]
+        self.arrow_schema = pa.schema(
+            [pa.field(name, arrow_types[t]) for name, t in zip(self.schema.fields_renamed, self.types)],
+            metadata={
+                "table": self.paramTableName,
+                "primary_key": json.dumps(self.paramPrimaryKey),
+                "incremental": json.dumps(bool(self.paramIncremental)),
+            },
+        )
+
+        self.pa = pa
+        os.makedirs(fileOutPath, exist_ok=True)
+        self.writer = pq.ParquetWriter(self.paramFilePath, self.arrow_schema, compression="zstd")
+        self.columns = [[] for _ in self.schema.fields]
+        self.invalid_values = 0
+
+        self.createManifest()
+
+    def createManifest(self):
+        # Parquet files are loaded to Storage as files, the manifest tags them so they can be found by the table name;
+        # they replace a table, so they are kept instead of expiring as temporary files do
+        template = {
+            "is_permanent": True,
+            "tags": ["jira", "parquet", self.paramTableName],
+        }
+
+        with open(self.paramFilePath + ".manifest", "w") as manifest:
+            json.dump(template, manifest)
+
+    def writerows(self, listToWrite, parentDict=None):
+        schema = self.schema
+        stats = self.stats
+        perf_counter = time.perf_counter
+
+        parsing_started = perf_counter()
+        for row in listToWrite:
+            flattening_started = perf_counter()
+            stats.parse_seconds += flattening_started - parsing_started
+
+            self.append_row(schema.csv_row(row, parentDict))
+            stats.flatten_seconds += perf_counter() - flattening_started
+
+            if len(self.columns[0]) >= ROW_GROUP_SIZE:
+                self.flush()
+
+            parsing_started = perf_counter()
+
+    def write_table_rows(self, rows):
+        """Write rows already built in the form of the table, e.g. by `transform.issue_row`, skipping the flatten."""
+        stats = self.stats
+        perf_counter = time.perf_counter
+
+        parsing_started = perf_counter()
+        for row in rows:
+            converting_started = perf_counter()
+            stats.parse_seconds += converting_started - parsing_started
+
+            self.append_row(row)
+            stats.flatten_seconds += perf_counter() - converting_started
+
+            if len(self.columns[0]) >= ROW_GROUP_SIZE:
+                self.flush()
+
+            parsing_started = perf_counter()
+
+    def append_row(self, row):
+        for column, field_name, converter in zip(self.columns, self.schema.fields, self.converters):
+            value = row.get(field_name)
+
+            # empty values are nulls, except in string columns where they are kept as in the CSV files
+            if value is None or (value == "" and converter is not _to_string):
+                value = None
+            else:
+                try:
+                    value = converter(value)
+                except (ValueError, TypeError, KeyError):
+                    self.invalid_values += 1
+                    value = None
+
+            column.append(value)
+
+        self.stats.rows += 1
+
+    def flush(self):
+        if not self.columns[0]:
+            return
+
+        writing_started = time.perf_counter()
+        arrays = [self.pa.array(column, type=f.type) for column, f in zip(self.columns, self.arrow_schema)]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.arrow_schema))
+
+        for column in self.columns:
+            column.clear()
+
+        self.stats.write_seconds += time.perf_counter() - writing_started
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+        if self.invalid_values:
+            logging.warning(
+                f"{self.invalid_values} values of table {self.paramTableName} could not be converted to the type "
+                f"of their Parquet column and were written as null."
+            )
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+# lowest rate the limiter slows down to after repeated throttling
+MIN_RATE = 0.5
+# share of the current rate kept after a 429 or a "near limit" warning
+DECREASE_FACTOR = 0.5
+NEAR_LIMIT_FACTOR = 0.8
+# requests per second added back after every successful response
+INCREASE_STEP = 0.1
+MAX_BACKOFF = 60
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket shared by all requests of a client. The rate follows the X-RateLimit-* headers returned by Jira,
+    halves on every 429 response and slowly recovers afterwards. A 429 pauses all requests, not only the one which
+    was throttled, for the time given by Retry-After.
+
+    The limiter is used as an async context manager around every request attempt. With `max_in_flight` set, it is
+    also the global budget of requests running at the same time, shared by all datasets downloaded in parallel.
+    """
+
+    def __init__(self, max_rate=None, max_in_flight=None):
+        self.max_rate = max_rate or None
+        self.in_flight = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+        self.rate = self.max_rate
+        self.tokens = 1.0
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self.consecutive_throttles = 0
+        self.recent_requests = deque()
+
+        self.requests_count = 0
+        self.throttled_count = 0
+        self.throttled_seconds = 0.0
+        self.waited_seconds = 0.0
+
+    async def __aenter__(self):
+        # the slot is taken first, so that no token is used up while waiting for it
+        if self.in_flight is not None:
+            await self.in_flight.acquire()
+
+        try:
+            await self.acquire()
+        except BaseException:
+            if self.in_flight is not None:
+                self.in_flight.release()
+            raise
+
+        return self
+
+    async def __aexit__(self, *args):
+        if self.in_flight is not None:
+            self.in_flight.release()
+        return None
+
+    async def acquire(self):
+        start = time.monotonic()
+
+        while True:
+            now = time.monotonic()
+
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+
+            if self.rate is None:
+                break
+
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                break
+
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+        now = time.monotonic()
+        self.waited_seconds += now - start
+        self.requests_count += 1
+        self.recent_requests.append(now)
+        while self.recent_requests and self.recent_requests[0] < now - 1:
+            self.recent_requests.popleft()
+
+    def _refill(self, now):
+        self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def _set_rate(self, rate):
+        if self.max_rate:
+            rate = min(rate, self.max_rate)
+        rate = max(rate, MIN_RATE)
+
+        if self.rate is None:
+            self.tokens = 1.0
+            self.last_refill = time.monotonic()
+        self.rate = rate
+
+    def throttle(self, headers):
+        """
+        Slow down after a 429 response and pause all requests for the time requested by the server.
+        Requests in flight when the limit is hit are usually throttled together; their responses arriving during
+        the pause belong to the same throttle event, so they may only extend the pause, not slow down again.
+        """
+        now = time.monotonic()
+        self.throttled_count += 1
+        delay = self._parse_retry_after(headers.get("Retry-After"))
+
+        if now < self.paused_until:
+            if delay is not None:
+                self._pause(now + delay)
+            return
+
+        self.consecutive_throttles += 1
+
+        current_rate = self.rate if self.rate is not None else max(len(self.recent_requests), 1)
+        self._set_rate(current_rate * DECREASE_FACTOR)
+
+        if delay is None:
+            delay = min(2 ** self.consecutive_throttles, MAX_BACKOFF)
+        self._pause(now + delay)
+
+        logging.warning(f"Jira API rate limit reached, pausing requests for {delay:.1f}s "
+                        f"and slowing down to {self.rate:.1f} requests/s.")
+
+    def _pause(self, resume_at):
+        if resume_at > self.paused_until:
+            self.throttled_seconds += resume_at - max(self.paused_until, time.monotonic())
+            self.paused_until = resume_at
+
+    def update(self, headers):
+        """Adjust the rate according to the rate limit headers of a successful response."""
+        self.consecutive_throttles = 0
+
+        fill_rate = headers.get("X-RateLimit-FillRate")
+        interval = headers.get("X-RateLimit-Interval-Seconds")
+        if fill_rate and interval:
+            try:
+                self._set_rate(float(fill_rate) / float(interval))
+                return
+            except (ValueError, ZeroDivisionError):
+                pass
+
+        if headers.get("X-RateLimit-NearLimit", "").lower() == "true" and self.rate is not None:
+            self._set_rate(self.rate * NEAR_LIMIT_FACTOR)
+
+        elif self.rate is not None and (self.max_rate is None or self.rate < self.max_rate):
+            self._set_rate(self.rate + INCREASE_STEP)
+
+    @staticmethod
+    def _parse_retry_after(value):
+        if not value:
+            return None
+
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+    @property
+    def stats(self):
+        return {
+            "requests": self.requests_count,
+            "throttled_responses": self.throttled_count,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+            "waited_seconds": round(self.waited_seconds, 3),
+            "current_rate": round(self.rate, 3) if self.rate is not None else None,
+        }
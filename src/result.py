@@ -1,7 +1,13 @@
 import csv
+import io
 import json
 import os
 import sys
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from metrics import TableMetrics
 
 csv.field_size_limit(sys.maxsize)  # to prevent _csv.Error: field larger than field limit
 
@@ -109,6 +115,12 @@ FIELDS_R_ISSUES = [
 ]
 PK_ISSUES = ["id"]
 JSON_ISSUES = ["fixVersions", "components", "subtasks", "custom_fields", "issuelinks", "versions"]
+# top-level Jira fields the issue columns are flattened from, e.g. "assignee" for "assignee_accountId"
+SEARCH_FIELDS_ISSUES = list(
+    dict.fromkeys(f.split("_")[0] for f in FIELDS_ISSUES if f not in ("id", "key", "custom_fields"))
+)
+# system fields which are returned by "*all" but never written to the issues table
+UNUSED_FIELDS_ISSUES = ["comment", "worklog", "attachment", "watches", "votes", "timetracking", "issuerestriction"]
 
 FIELDS_USERS = ["accountId", "displayName", "active", "accountType", "emailAddress", "locale"]
 FIELDS_R_USERS = ["account_id", "display_name", "active", "account_type", "email_address", "locale"]
@@ -298,6 +310,9 @@ FIELDS_R_COMMENTS = [
 PK_COMMENTS = ["comment_id"]
 JSON_COMMENTS = []
 
+FIELDS_RUN_METRICS = ["run_started", "category", "name", "metric", "value"]
+PK_RUN_METRICS = ["run_started", "category", "name", "metric"]
+
 FIELDS_ORGANIZATIONS = ["id", "name", "created_jira", "_links_self"]
 JSON_ORGANIZATIONS = []
 PK_ORGANIZATIONS = ["id"]
@@ -308,18 +323,170 @@ JSON_SERVICEDESKS = []
 PK_SERVICEDESKS = ["id"]
 FIELDS_R_SERVICEDESKS = ["id", "projectId", "projectName", "projectKey", "_links"]
 
-FIELDS_SERVICEDESK_CUSTOMERS = ["accountId", "emailAddress", "displayName", "active", "timeZone", "_links_self"]
+FIELDS_SERVICEDESK_CUSTOMERS = [
+    "accountId",
+    "emailAddress",
+    "displayName",
+    "active",
+    "timeZone",
+    "_links_self",
+    "servicedesk_id",
+]
 JSON_SERVICEDESK_CUSTOMERS = []
 PK_SERVICEDESK_CUSTOMERS = ["accountId"]
-FIELDS_R_SERVICEDESK_CUSTOMERS = ["accountId", "emailAddress", "displayName", "active", "timeZone", "_links"]
+FIELDS_R_SERVICEDESK_CUSTOMERS = [
+    "accountId",
+    "emailAddress",
+    "displayName",
+    "active",
+    "timeZone",
+    "_links",
+    "servicedesk_id",
+]
+
+
+@dataclass(frozen=True)
+class TableSchema:
+    name: str
+    fields: tuple
+    fields_renamed: tuple
+    primary_key: tuple
+    json_fields: frozenset
+    field_set: frozenset
+    # every "<key>_" prefix of a column, e.g. "assignee_" for "assignee_accountId"; nested dicts are only walked
+    # when their flattened name is one of these prefixes
+    flatten_prefixes: frozenset
+
+    @classmethod
+    def build(cls, name, fields, fields_renamed, primary_key, json_fields):
+        return cls(
+            name=name,
+            fields=tuple(fields),
+            fields_renamed=tuple(fields_renamed),
+            primary_key=tuple(primary_key),
+            json_fields=frozenset(json_fields),
+            field_set=frozenset(fields),
+            flatten_prefixes=frozenset(f[: idx + 1] for f in fields for idx, char in enumerate(f) if char == "_"),
+        )
+
+    def flatten(self, row, out=None, name=""):
+        """
+        Flatten a nested row into "parent_child" keys, keeping only the columns of the table.
+        Produces the same values as a full flatten followed by a column filter, but never walks subtrees
+        that no column is built from.
+        """
+        if out is None:
+            out = dict()
+
+        for key, value in row.items():
+            full_name = name + key
+
+            if type(value) is dict:
+                if full_name + "_" in self.flatten_prefixes:
+                    self.flatten(value, out, full_name + "_")
+
+            elif full_name in self.field_set:
+                out[full_name] = value
+
+        return out
+
+    def csv_row(self, row, parentDict=None):
+        """Flatten a row and serialize its JSON columns, producing the dict written to the CSV file."""
+        _cust = row.get("custom_fields", None)
+
+        _dictToWrite = self.flatten(row)
+
+        for key in self.json_fields.intersection(_dictToWrite):
+            _dictToWrite[key] = json.dumps(_dictToWrite[key])
+
+        if parentDict is not None:
+            _dictToWrite = {**_dictToWrite, **parentDict}
+
+        if _cust is not None:
+            _dictToWrite["custom_fields"] = json.dumps(_cust)
+
+        return _dictToWrite
+
+
+CSV_WRITER_OPTIONS = MappingProxyType(
+    {"restval": "", "extrasaction": "ignore", "quotechar": '"', "quoting": csv.QUOTE_ALL}
+)
+
+TABLE_SCHEMAS = MappingProxyType(
+    {
+        schema.name: schema
+        for schema in [
+            TableSchema.build("issues", FIELDS_ISSUES, FIELDS_R_ISSUES, PK_ISSUES, JSON_ISSUES),
+            TableSchema.build("users", FIELDS_USERS, FIELDS_R_USERS, PK_USERS, JSON_USERS),
+            TableSchema.build("fields", FIELDS_FIELDS, FIELDS_R_FIELDS, PK_FIELDS, JSON_FIELDS),
+            TableSchema.build("projects", FIELDS_PROJECTS, FIELDS_R_PROJECTS, PK_PROJECTS, JSON_PROJECTS),
+            TableSchema.build(
+                "worklogs-deleted",
+                FIELDS_WORKLOGS_DELETED,
+                FIELDS_R_WORKLOGS_DELETED,
+                PK_WORKLOGS_DELETED,
+                JSON_WORKLOGS_DELETED,
+            ),
+            TableSchema.build("worklogs", FIELDS_WORKLOGS, FIELDS_R_WORKLOGS, PK_WORKLOGS, JSON_WORKLOGS),
+            TableSchema.build(
+                "issues-changelogs",
+                FIELDS_ISSUES_CHANGELOGS,
+                FIELDS_R_ISSUES_CHANGELOGS,
+                PK_ISSUES_CHANGELOGS,
+                JSON_ISSUES_CHANGELOGS,
+            ),
+            TableSchema.build("boards", FIELDS_BOARDS, FIELDS_R_BOARDS, PK_BOARDS, JSON_BOARDS),
+            TableSchema.build("sprints", FIELDS_SPRINTS, FIELDS_R_SPRINTS, PK_SPRINTS, JSON_SPRINTS),
+            TableSchema.build(
+                "sprints-issues", FIELDS_SPRINTS_ISSUES, FIELDS_R_SPRINTS_ISSUES, PK_SPRINTS_ISSUES, JSON_SPRINTS_ISSUES
+            ),
+            TableSchema.build("comments", FIELDS_COMMENTS, FIELDS_R_COMMENTS, PK_COMMENTS, JSON_COMMENTS),
+            TableSchema.build(
+                "organizations", FIELDS_ORGANIZATIONS, FIELDS_R_ORGANIZATIONS, PK_ORGANIZATIONS, JSON_ORGANIZATIONS
+            ),
+            TableSchema.build(
+                "servicedesks", FIELDS_SERVICEDESKS, FIELDS_R_SERVICEDESKS, PK_SERVICEDESKS, JSON_SERVICEDESKS
+            ),
+            TableSchema.build(
+                "servicedesk-customers",
+                FIELDS_SERVICEDESK_CUSTOMERS,
+                FIELDS_R_SERVICEDESK_CUSTOMERS,
+                PK_SERVICEDESK_CUSTOMERS,
+                JSON_SERVICEDESK_CUSTOMERS,
+            ),
+        ]
+    }
+)
+
+
+class CsvRowFormatter:
+    """Formats rows of a table to CSV text exactly as JiraWriter writes them, without a file."""
+
+    def __init__(self, tableName):
+        self.schema = TABLE_SCHEMAS[tableName]
+        self.buffer = io.StringIO()
+        self.writer = csv.DictWriter(self.buffer, fieldnames=self.schema.fields, **CSV_WRITER_OPTIONS)
+
+    def format(self, rows):
+        return self.format_table_rows(self.schema.csv_row(row) for row in rows)
+
+    def format_table_rows(self, rows):
+        """Format rows already built in the form of the table, e.g. by `transform.issue_row`."""
+        self.writer.writerows(rows)
+
+        chunk = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return chunk
 
 
 class JiraWriter:
-    def __init__(self, tableOutPath, tableName, incremental, custom_name="", pk_override=None):
-        self.paramFields = eval(f"FIELDS_{tableName.upper().replace('-', '_')}")
-        self.paramJsonFields = eval(f"JSON_{tableName.upper().replace('-', '_')}")
-        self.paramPrimaryKey = pk_override or eval(f"PK_{tableName.upper().replace('-', '_')}")
-        self.paramFieldsRenamed = eval(f"FIELDS_R_{tableName.upper().replace('-', '_')}")
+    def __init__(self, tableOutPath, tableName, incremental, custom_name="", pk_override=None, metrics=None):
+        self.schema = TABLE_SCHEMAS[tableName]
+        self.paramFields = self.schema.fields
+        self.paramJsonFields = self.schema.json_fields
+        self.paramPrimaryKey = list(pk_override or self.schema.primary_key)
+        self.paramFieldsRenamed = list(self.schema.fields_renamed)
         self.paramPath = tableOutPath
         self.paramTableName = tableName
         self.paramTable = tableName + ".csv"
@@ -328,6 +495,8 @@ class JiraWriter:
             self.paramTable = custom_name + ".csv"
         self.paramTablePath = os.path.join(self.paramPath, self.paramTable)
         self.paramIncremental = incremental
+        # rows and processing time are added to the run metrics if given, otherwise they are only kept here
+        self.stats = metrics.tables[self.paramTableName] if metrics is not None else TableMetrics()
 
         self.createManifest()
         self.createWriter()
@@ -346,51 +515,53 @@ class JiraWriter:
 
     def createWriter(self):
         self.csvfile = open(self.paramTablePath, "w", newline="")
-        self.writer = csv.DictWriter(
-            self.csvfile,
-            fieldnames=self.paramFields,
-            restval="",
-            extrasaction="ignore",
-            quotechar='"',
-            quoting=csv.QUOTE_ALL,
-        )
+        self.writer = csv.DictWriter(self.csvfile, fieldnames=self.paramFields, **CSV_WRITER_OPTIONS)
 
     def close(self):
         self.csvfile.close()
 
-    def writerows(self, listToWrite, parentDict=None):
-        for row in listToWrite:
-            _cust = row.get("custom_fields", None)
+    def write_csv(self, chunk, rows):
+        """Append rows already formatted by a CsvRowFormatter of the same table, e.g. in a worker process."""
+        writing_started = time.perf_counter()
+        self.csvfile.write(chunk)
+
+        self.stats.write_seconds += time.perf_counter() - writing_started
+        self.stats.rows += rows
 
-            row_f = self.flatten_json(x=row)
-            _dictToWrite = {}
+    def write_table_rows(self, rows):
+        """Write rows already built in the form of the table, e.g. by `transform.issue_row`, skipping the flatten."""
+        stats = self.stats
+        perf_counter = time.perf_counter
 
-            for key, value in row_f.items():
-                if key in self.paramJsonFields:
-                    _dictToWrite[key] = json.dumps(value)
+        parsing_started = perf_counter()
+        for row in rows:
+            writing_started = perf_counter()
+            stats.parse_seconds += writing_started - parsing_started
 
-                elif key in self.paramFields:
-                    _dictToWrite[key] = value
+            self.writer.writerow(row)
 
-                else:
-                    continue
+            parsing_started = perf_counter()
+            stats.write_seconds += parsing_started - writing_started
+            stats.rows += 1
 
-            if parentDict is not None:
-                _dictToWrite = {**_dictToWrite, **parentDict}
+    def writerows(self, listToWrite, parentDict=None):
+        schema = self.schema
+        stats = self.stats
+        perf_counter = time.perf_counter
 
-            if _cust is not None:
-                _dictToWrite = {**_dictToWrite, **{"custom_fields": json.dumps(_cust)}}
+        # rows may be produced lazily, e.g. transformed issues, the time spent getting them is accounted as parsing
+        parsing_started = perf_counter()
+        for row in listToWrite:
+            flattening_started = perf_counter()
+            stats.parse_seconds += flattening_started - parsing_started
 
-            self.writer.writerow(_dictToWrite)
+            _dictToWrite = schema.csv_row(row, parentDict)
 
-    def flatten_json(self, x, out=None, name=""):
-        if out is None:
-            out = dict()
+            writing_started = perf_counter()
+            stats.flatten_seconds += writing_started - flattening_started
 
-        if type(x) is dict:
-            for a in x:
-                self.flatten_json(x[a], out, name + a + "_")
-        else:
-            out[name[:-1]] = x
+            self.writer.writerow(_dictToWrite)
 
-        return out
+            parsing_started = perf_counter()
+            stats.write_seconds += parsing_started - writing_started
+            stats.rows += 1
@@ -0,0 +1,44 @@
+import asyncio
+import logging
+
+
+class DatasetScheduler:
+    """
+    Runs dataset downloads concurrently, all of them start right away, so the run takes as long as its longest
+    dataset instead of a sum of fixed stages. Datasets using the data of another one do not wait for it to finish,
+    it is passed on while being downloaded, e.g. issue IDs are sent to the comments through a Channel.
+    If a dataset fails, all the others are cancelled and its exception is raised.
+    """
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics
+        self.datasets = {}
+
+    def add(self, name, run, description=None):
+        """
+        Args:
+            name: Unique name of the dataset, also used in the run metrics.
+            run: Function without arguments returning the coroutine downloading the dataset.
+            description: Text of the log message written when the download starts, the name by default.
+        """
+        if name in self.datasets:
+            raise ValueError(f"Dataset {name} is already scheduled.")
+
+        self.datasets[name] = (run, description or name)
+
+    async def run(self):
+        async def run_dataset(name, run, description):
+            logging.info(f"Downloading {description}.")
+            if self.metrics is not None:
+                await self.metrics.timed(name, run())
+            else:
+                await run()
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                for name, (run, description) in self.datasets.items():
+                    group.create_task(run_dataset(name, run, description))
+
+        except ExceptionGroup as e:
+            # the component distinguishes user errors by the exception type, so the group is not propagated
+            raise e.exceptions[0]
@@ -0,0 +1,141 @@
+# Transformations of issues to table rows. They do not depend on the component, so they can also run in worker
+# processes, see `format_issue_page`.
+import itertools
+import json
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from adf import DESCRIPTION_RENDERER
+from json_codec import decode_json
+from result import TABLE_SCHEMAS, CsvRowFormatter
+
+ISSUES_SCHEMA = TABLE_SCHEMAS["issues"]
+
+
+def issue_row(issue):
+    """
+    Build the issues table row of an issue in a single pass over its fields: nested fields are flattened only along
+    the paths of the columns, the description is rendered and custom fields are serialized to one JSON column.
+    Produces the same row as a transformed issue passed through `TableSchema.csv_row`.
+    """
+    schema = ISSUES_SCHEMA
+    _out = {"id": issue["id"], "key": issue["key"]}
+    _custom = {}
+
+    for key, value in issue["fields"].items():
+        if "customfield_" in key:
+            _custom[key] = value
+        elif key == "description":
+            _out["description"] = DESCRIPTION_RENDERER.render(value).strip("\n").replace("\0", "\\0")
+        elif type(value) is dict:
+            if key + "_" in schema.flatten_prefixes:
+                schema.flatten(value, _out, key + "_")
+        elif key in schema.field_set:
+            _out[key] = value
+
+    for key in schema.json_fields.intersection(_out):
+        _out[key] = json.dumps(_out[key])
+
+    _out["custom_fields"] = json.dumps(_custom)
+    return _out
+
+
+def parse_changelogs(changelogs, issue_id, issue_key):
+    for changelog in changelogs:
+        _out = dict()
+        _out["total_changed_items"] = len(changelog["items"])
+        _out["id"] = changelog["id"]
+        _out["issue_id"] = issue_id
+        _out["issue_key"] = issue_key
+        _out["author_accountId"] = changelog.get("author", {}).get("accountId", "")
+        _out["author_emailAddress"] = changelog.get("author", {}).get("emailAddress", "")
+        _out["created"] = changelog["created"]
+
+        for idx, item in enumerate(changelog["items"], start=1):
+            yield {**_out, **item, "changed_item_order": idx}
+
+
+@dataclass
+class IssuePage:
+    """
+    A page of issue search results formatted to CSV by `format_issue_page`.
+    Args:
+        issues: Minimal issues with only id, key and the "updated" field, in the structure of the API response.
+        issue_rows: CSV text of the issues table row of each issue.
+        changelog_rows: CSV text of the changelog rows of each issue, empty for issues in `truncated_changelogs`.
+        changelog_counts: Number of changelog rows of each issue.
+        truncated_changelogs: (id, key) of issues whose changelog has to be downloaded separately.
+        is_complete: Whether this is the last page.
+        next_token: Token of the next page.
+        seconds: Time the worker spent on the page.
+    """
+    issues: List[dict] = field(default_factory=list)
+    issue_rows: List[str] = field(default_factory=list)
+    changelog_rows: List[str] = field(default_factory=list)
+    changelog_counts: List[int] = field(default_factory=list)
+    truncated_changelogs: List[tuple] = field(default_factory=list)
+    is_complete: bool = True
+    next_token: Optional[str] = None
+    seconds: float = 0.0
+
+    def select(self, mask):
+        """Return the page with only the issues for which the mask is true."""
+        issue_ids = {issue["id"] for issue, keep in zip(self.issues, mask) if keep}
+
+        return IssuePage(
+            issues=list(itertools.compress(self.issues, mask)),
+            issue_rows=list(itertools.compress(self.issue_rows, mask)),
+            changelog_rows=list(itertools.compress(self.changelog_rows, mask)),
+            changelog_counts=list(itertools.compress(self.changelog_counts, mask)),
+            truncated_changelogs=[issue for issue in self.truncated_changelogs if issue[0] in issue_ids],
+            is_complete=self.is_complete,
+            next_token=self.next_token,
+            seconds=self.seconds,
+        )
+
+
+# formatters are created once per worker process and reused for all pages it formats
+_formatters = {}
+
+
+def _formatter(table_name):
+    if table_name not in _formatters:
+        _formatters[table_name] = CsvRowFormatter(table_name)
+    return _formatters[table_name]
+
+
+def format_issue_page(content, with_changelogs):
+    """
+    Decode a raw page of the issue search, transform its issues and format them to CSV. Runs in a worker process,
+    so only the text of the rows and a few values needed by the download itself are sent back.
+    """
+    start = time.process_time()
+    data = decode_json(content)
+
+    page = IssuePage(next_token=data.get("nextPageToken"))
+    page.is_complete = bool(data["isLast"]) if "isLast" in data else not page.next_token
+
+    issues_formatter = _formatter("issues")
+    changelogs_formatter = _formatter("issues-changelogs") if with_changelogs else None
+
+    for issue in data.get("issues", []):
+        page.issues.append(
+            {"id": issue["id"], "key": issue["key"], "fields": {"updated": issue["fields"].get("updated")}}
+        )
+        page.issue_rows.append(issues_formatter.format_table_rows([issue_row(issue)]))
+
+        if changelogs_formatter is not None:
+            _changelog = issue["changelog"]
+
+            if _changelog["maxResults"] < _changelog["total"]:
+                page.truncated_changelogs.append((issue["id"], issue["key"]))
+                page.changelog_rows.append("")
+                page.changelog_counts.append(0)
+            else:
+                changelogs = list(parse_changelogs(_changelog["histories"], issue["id"], issue["key"]))
+                page.changelog_rows.append(changelogs_formatter.format(changelogs))
+                page.changelog_counts.append(len(changelogs))
+
+    page.seconds = time.process_time() - start
+    return page
@@ -0,0 +1,46 @@
+"""
+Rendering time of a multi-megabyte ADF description and comment: the recursive renderers used before against
+AdfRenderer, and of a deeply nested document which the recursive renderer cannot handle at all.
+
+    python -m tests.benchmarks.bench_adf
+"""
+import json
+import timeit
+
+from adf import COMMENT_RENDERER, DESCRIPTION_RENDERER
+from tests.fixtures import adf_document
+from tests.test_adf import merge_text_and_mentions, nested_document, parse_description
+
+PARAGRAPHS = 20000
+DEPTH = 100000
+
+
+def measure(render):
+    return min(timeit.repeat(render, number=1, repeat=3))
+
+
+def main():
+    document = adf_document(1, paragraphs=PARAGRAPHS)
+    size = len(json.dumps(document)) / 2 ** 20
+    print(f"document of {PARAGRAPHS} paragraphs, {size:.1f} MiB of JSON")
+
+    for name, render in [
+        ("description, recursive", lambda: parse_description(document)),
+        ("description, AdfRenderer", lambda: DESCRIPTION_RENDERER.render(document)),
+        ("comment, recursive", lambda: merge_text_and_mentions({"body": document})),
+        ("comment, AdfRenderer", lambda: COMMENT_RENDERER.render(document)),
+    ]:
+        print(f"{name:<28} {measure(render) * 1000:>8.1f} ms")
+
+    nested = nested_document(DEPTH)
+    try:
+        parse_description(nested)
+        recursive = "ok"
+    except RecursionError:
+        recursive = "RecursionError"
+    seconds = measure(lambda: DESCRIPTION_RENDERER.render(nested))
+    print(f"{DEPTH} nested nodes: recursive {recursive}, AdfRenderer {seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
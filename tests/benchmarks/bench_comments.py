@@ -0,0 +1,53 @@
+"""
+Wall time of downloading the comments of issues with one request per issue, as `download_and_write_comments` does,
+against a fake API answering every request after a fixed latency, at several values of `max_concurrency`. With calls
+overlapping, the time falls with the concurrency until it reaches the rate the client allows.
+
+    python -m tests.benchmarks.bench_comments
+"""
+import asyncio
+import io
+import logging
+import re
+import time
+
+import httpx
+
+from tests.fake_jira import FakeJira, fake_component
+from tests.test_component import comment
+
+ISSUES = 200
+LATENCY = 0.05
+CONCURRENCY = (1, 5, 10, 20)
+
+
+def comments(request):
+    issue_id = re.search(r"issue/(\d+)/comment", request.url.path).group(1)
+    return httpx.Response(200, json={"comments": [comment(issue_id, i) for i in range(3)]})
+
+
+def main():
+    logging.disable(logging.WARNING)
+    issue_ids = [str(10000 + i) for i in range(ISSUES)]
+
+    for concurrency in CONCURRENCY:
+        fake = FakeJira(latency=LATENCY)
+        fake.route("/comment", comments)
+
+        with fake_component(fake, max_concurrency=concurrency) as jira:
+            output = io.StringIO()
+            writer = jira.create_comments_writer(output)
+
+            started = time.monotonic()
+            asyncio.run(jira.download_and_write_comments(issue_ids, writer))
+            elapsed = time.monotonic() - started
+
+        rows = output.getvalue().count("\n")
+        print(
+            f"max_concurrency {concurrency:>3}  {elapsed:>6.2f}s  {len(fake.requests)} requests  {rows} comments  "
+            f"({LATENCY * 1000:.0f} ms latency)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Time to decode a page of the issue search, with the standard library decoder and the fast decoders installed, and to
+decode, transform and format the page to CSV rows as `transform.format_issue_page` does, with each of the decoders.
+
+    python -m tests.benchmarks.bench_decode
+"""
+import json
+import timeit
+from unittest import mock
+
+import json_codec
+from tests.fixtures import issue, search_page
+from transform import format_issue_page
+
+ISSUES = 100
+
+
+def decoders():
+    yield "json", json.loads
+
+    if json_codec.orjson is not None:
+        yield "orjson", json_codec.orjson.loads
+
+    if json_codec.msgspec is not None:
+        yield "msgspec", json_codec.msgspec.json.Decoder().decode
+
+
+def main():
+    content = json.dumps(
+        search_page([issue(i, custom_fields=60, histories=5) for i in range(ISSUES)], next_page_token="next")
+    ).encode()
+    print(f"page of {ISSUES} issues, {len(content) / 2 ** 20:.1f} MiB")
+
+    for name, decode in decoders():
+        decode_seconds = min(timeit.repeat(lambda: decode(content), number=5, repeat=5)) / 5
+
+        with mock.patch.object(json_codec, "_decode", decode):
+            page_seconds = min(timeit.repeat(lambda: format_issue_page(content, True), number=1, repeat=5))
+
+        print(
+            f"{name:<8} decode {decode_seconds * 1000:>6.1f} ms ({len(content) / 2 ** 20 / decode_seconds:>5.0f} MiB/s)"
+            f"  decode + transform + format {page_seconds * 1000:>6.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
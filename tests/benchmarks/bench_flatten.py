@@ -0,0 +1,30 @@
+"""
+Throughput of flattening issue rows for the CSV writer: the full flatten followed by a column filter, which the writer
+used before, against the schema flatten which only walks paths the columns are built from.
+
+    python -m tests.benchmarks.bench_flatten
+"""
+import timeit
+
+from result import TABLE_SCHEMAS
+from tests.fixtures import issue
+from tests.test_result import flatten_and_filter
+from tests.test_transform import transform_issue
+
+ROWS = 2000
+
+
+def main():
+    schema = TABLE_SCHEMAS["issues"]
+    rows = [transform_issue(issue(i, custom_fields=60)) for i in range(ROWS)]
+
+    for name, flatten in [
+        ("flatten + filter", lambda: [flatten_and_filter(schema, row) for row in rows]),
+        ("schema flatten", lambda: [schema.csv_row(row) for row in rows]),
+    ]:
+        seconds = min(timeit.repeat(flatten, number=1, repeat=5))
+        print(f"{name:<18} {ROWS / seconds:>10,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
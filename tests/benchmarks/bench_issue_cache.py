@@ -0,0 +1,98 @@
+"""
+Requests and fully downloaded issues of a run with the issue download and a custom JQL query over a third of the same
+issues, which start together, with and without the issue cache. The custom query returns its issues in the same order
+as the issue download, or in the opposite one, so it asks for issues the download reaches only at its end. A small
+cache shows the cost of rows evicted before the custom query looks them up.
+
+    python -m tests.benchmarks.bench_issue_cache
+"""
+import asyncio
+import json
+import logging
+import re
+import time
+from unittest import mock
+
+import httpx
+
+import component
+from tests.fake_jira import FakeJira, fake_component
+from tests.fixtures import issue
+
+ISSUES = 3000
+CUSTOM_JQL = "project = P1"
+
+
+class SearchServer:
+    """Issue search answering the JQL of the issue download, the custom query and `id in (...)` searches."""
+
+    def __init__(self, reverse_custom):
+        self.issues = {str(10000 + i): issue(i, custom_fields=60) for i in range(ISSUES)}
+        self.reverse_custom = reverse_custom
+        self.full_issues = 0
+
+    def select(self, jql):
+        if match := re.fullmatch(r"id in \((.*)\)", jql):
+            return match.group(1).split(", ")
+
+        issue_ids = list(self.issues)
+        if jql == CUSTOM_JQL:
+            issue_ids = issue_ids[::-1] if self.reverse_custom else issue_ids
+            return issue_ids[::3]
+
+        return issue_ids
+
+    def handle(self, request):
+        payload = json.loads(request.content)
+        issue_ids = self.select(payload["jql"])
+        start = int(payload.get("nextPageToken") or 0)
+        end = min(start + payload["maxResults"], len(issue_ids))
+
+        issues = [self.issues[issue_id] for issue_id in issue_ids[start:end]]
+        if payload["fields"] == ["updated"]:
+            issues = [{"id": i["id"], "key": i["key"], "fields": {"updated": i["fields"]["updated"]}} for i in issues]
+        else:
+            self.full_issues += len(issues)
+
+        page = {"issues": issues, "isLast": end >= len(issue_ids)}
+        if end < len(issue_ids):
+            page["nextPageToken"] = str(end)
+        return httpx.Response(200, json=page)
+
+
+def run(reverse_custom, cache_bytes):
+    server = SearchServer(reverse_custom)
+    fake = FakeJira(latency=0.02)
+    fake.route("/search/jql", server.handle)
+    for path in ("/project", "/field", "/users"):
+        fake.route(path, lambda request: httpx.Response(200, json=[]))
+
+    custom_jql = [{"jql": CUSTOM_JQL, "table_name": "custom"}]
+    with mock.patch.object(component, "ISSUE_ROW_CACHE_BYTES", cache_bytes), \
+            fake_component(fake, datasets=["issues"], custom_jql=custom_jql) as jira:
+        if not cache_bytes:
+            jira.issue_cache = None
+
+        started = time.monotonic()
+        asyncio.run(jira.run_async())
+        elapsed = time.monotonic() - started
+
+    searches = sum(request.url.path.endswith("/search/jql") for request in fake.requests)
+    return jira.issue_cache, searches, server.full_issues, elapsed
+
+
+def main():
+    logging.disable(logging.WARNING)
+
+    for reverse_custom in (False, True):
+        for name, cache_bytes in [("no cache", 0), ("64 MiB", 64 * 2 ** 20), ("2 MiB", 2 * 2 ** 20)]:
+            cache, searches, full_issues, elapsed = run(reverse_custom, cache_bytes)
+            hit_rate = f"{cache.hits / (ISSUES // 3):>4.0%}" if cache else "   -"
+            print(
+                f"{'reversed' if reverse_custom else 'same':<8} order  {name:<8}  hit rate {hit_rate}  "
+                f"{searches:>3} searches  {full_issues:>5} full issues  {elapsed:>5.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Time and memory allocated to build issues table rows: the transformation followed by the writer's flatten, as before,
+against the single pass of `transform.issue_row`. Memory is the mean of the peak traced by tracemalloc while a single
+row is built, above what was allocated before, i.e. the temporary objects of one row including the row itself.
+
+    python -m tests.benchmarks.bench_issue_rows
+"""
+import timeit
+
+from tests.fixtures import issue
+from tests.test_transform import allocated_per_row, two_pass_row
+from transform import issue_row
+
+ISSUES = 1000
+
+
+def main():
+    issues = [issue(i, custom_fields=60) for i in range(ISSUES)]
+
+    for name, build in [("two pass", two_pass_row), ("issue_row", issue_row)]:
+        seconds = min(timeit.repeat(lambda: [build(i) for i in issues], number=1, repeat=7))
+        print(
+            f"{name:<10} {ISSUES / seconds:>8,.0f} issues/s  "
+            f"{allocated_per_row(build, issues) / 1024:>6.1f} KiB peak allocation per row"
+        )
+
+
+if __name__ == "__main__":
+    main()
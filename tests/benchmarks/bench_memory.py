@@ -0,0 +1,83 @@
+"""
+Peak memory of downloading a dataset from a synthetic fixture server and writing it to its table, with pages
+streamed to the writer as they arrive against all pages collected into one list first. Streaming stays flat as the
+dataset grows, collecting grows with it. Memory is the peak traced by tracemalloc, so it covers Python objects only.
+
+    python -m tests.benchmarks.bench_memory
+"""
+import asyncio
+import logging
+import tempfile
+import tracemalloc
+
+from component import JiraComponent
+from result import JiraWriter
+from tests.fake_jira import FakeJira, offset_pages, search_pages
+from tests.fixtures import issue, user
+from transform import issue_row
+
+USERS = (10000, 40000)
+ISSUES = (500, 2000)
+
+
+async def stream_users(jira, writer):
+    async for users in jira.iter_users():
+        writer.writerows(users)
+
+
+async def collect_users(jira, writer):
+    writer.writerows(await jira.get_users())
+
+
+def issue_pages(jira):
+    async def get_page(token):
+        return await jira.get_issues("2024-01-01", next_page_token=token, issue_jql_filter=None)
+
+    return JiraComponent.iter_issue_pages(get_page)
+
+
+async def stream_issues(jira, writer):
+    async for issues in issue_pages(jira):
+        writer.write_table_rows(map(issue_row, issues))
+
+
+async def collect_issues(jira, writer):
+    issues = [i async for issues in issue_pages(jira) for i in issues]
+    writer.write_table_rows(map(issue_row, issues))
+
+
+def peak_memory(fake, table_name, download):
+    async def run():
+        with tempfile.TemporaryDirectory() as directory:
+            writer = JiraWriter(directory, table_name, incremental=True)
+            await download(fake.client(), writer)
+            writer.close()
+
+    tracemalloc.start()
+    try:
+        asyncio.run(run())
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    logging.disable(logging.WARNING)
+
+    for count in USERS:
+        fake = FakeJira()
+        fake.route("/users", offset_pages(count, lambda i: user(f"u{i}"), end="short"))
+        for name, download in [("stream", stream_users), ("collect", collect_users)]:
+            peak = peak_memory(fake, "users", download)
+            print(f"users   {count:>6}  {name:<8} peak {peak / 2 ** 20:>7.1f} MiB")
+
+    for count in ISSUES:
+        fake = FakeJira()
+        fake.route("/search/jql", search_pages(count, lambda i: issue(i, custom_fields=60, histories=5)))
+        for name, download in [("stream", stream_issues), ("collect", collect_issues)]:
+            peak = peak_memory(fake, "issues", download)
+            print(f"issues  {count:>6}  {name:<8} peak {peak / 2 ** 20:>7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
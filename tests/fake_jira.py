@@ -0,0 +1,176 @@
+"""A fake Jira API served through httpx.MockTransport, for tests and benchmarks of JiraClient."""
+import asyncio
+import contextlib
+import json
+import os
+import tempfile
+import time
+from unittest import mock
+
+import httpx
+
+from client import JiraClient
+from component import JiraComponent
+
+
+class FakeJira:
+    """
+    Serves the routes registered with `route` and records every request. With `quota` set, it enforces a token
+    bucket of `quota` requests per second with bursts of `burst` requests, as Jira Cloud does, and answers requests
+    over the quota with 429 and the given Retry-After. Responses are sent `latency` seconds after a request
+    arrives, so that concurrent requests are in flight at the same time.
+    """
+
+    def __init__(self, quota=None, burst=1, retry_after=None, latency=0.0):
+        self.routes = []
+        self.latency = latency
+        self.requests = []
+        self.throttled = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        self.quota = quota
+        self.burst = burst
+        self.retry_after = retry_after
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+
+    def route(self, path_suffix, handler):
+        """Answer requests whose path ends with `path_suffix` by `handler(request)`, returning a httpx.Response."""
+        self.routes.append((path_suffix, handler))
+
+    def transport(self):
+        return httpx.MockTransport(self.handle)
+
+    def client(self, **kwargs):
+        """A JiraClient sending its requests to this fake API."""
+        return self.serve(JiraClient("example", "user", "token", **kwargs))
+
+    def serve(self, jira):
+        """Redirect the requests of an existing JiraClient, e.g. the one of a component, to this fake API."""
+        jira.client = httpx.AsyncClient(
+            transport=self.transport(), auth=jira.auth, headers=jira.default_headers,
+            event_hooks=jira.client.event_hooks,
+        )
+        return jira
+
+    def over_quota(self):
+        if self.quota is None:
+            return False
+
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.quota)
+        self.last_refill = now
+
+        if self.tokens < 1:
+            return True
+
+        self.tokens -= 1
+        return False
+
+    async def handle(self, request):
+        self.requests.append(request)
+        over_quota = self.over_quota()
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+        if over_quota:
+            self.throttled += 1
+            headers = {"Retry-After": str(self.retry_after)} if self.retry_after is not None else {}
+            return httpx.Response(429, headers=headers, text="Rate limit exceeded")
+
+        for path_suffix, handler in self.routes:
+            if request.url.path.endswith(path_suffix):
+                return handler(request)
+
+        return httpx.Response(404, text=f"No route for {request.url.path}")
+
+
+DEFAULT_PARAMETERS = {
+    "username": "user",
+    "#token": "token",
+    "organization_id": "example",
+    "organization_url": "https://example.atlassian.net",
+    "since": "2000-01-01",
+    "incremental": 1,
+    "datasets": [],
+}
+
+
+@contextlib.contextmanager
+def fake_component(fake=None, state=None, **parameters):
+    """
+    A JiraComponent in a temporary data directory, configured with `parameters` over DEFAULT_PARAMETERS and with
+    `state` as the state of the previous run. Its client sends requests to `fake`, if given.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        for path in ("in", "out/tables", "out/files"):
+            os.makedirs(os.path.join(directory, path))
+
+        with open(os.path.join(directory, "config.json"), "w") as config_file:
+            json.dump({"parameters": {**DEFAULT_PARAMETERS, **parameters}}, config_file)
+
+        if state is not None:
+            with open(os.path.join(directory, "in", "state.json"), "w") as state_file:
+                json.dump(state, state_file)
+
+        with mock.patch.dict(os.environ, {"KBC_DATADIR": directory}):
+            jira = JiraComponent()
+
+        if fake is not None:
+            fake.serve(jira.client)
+
+        yield jira
+
+
+def offset_pages(count, make_item, end="short", max_page_size=None, start_param="startAt", limit_param="maxResults"):
+    """
+    Handler of an offset-paginated endpoint with `count` items built by `make_item(index)` when they are requested.
+    Args:
+        end: How the last page is marked: "isLast" or "isLastPage" flags, the "total" count of items, or "short"
+            for a plain list of items which ends with a page shorter than requested.
+        max_page_size: Largest page the server returns, regardless of the requested size, as Jira does.
+    """
+
+    def handler(request):
+        start = int(request.url.params.get(start_param, 0))
+        size = int(request.url.params.get(limit_param, 50))
+        if max_page_size:
+            size = min(size, max_page_size)
+
+        values = [make_item(i) for i in range(start, min(start + size, count))]
+        if end == "short":
+            return httpx.Response(200, json=values)
+
+        page = {"startAt": start, "maxResults": size, "values": values}
+        if end == "total":
+            page["total"] = count
+        else:
+            page[end] = start + size >= count
+
+        return httpx.Response(200, json=page)
+
+    return handler
+
+
+def search_pages(count, make_issue):
+    """Handler of the issue search (search/jql) with `count` issues built by `make_issue(index)`, paginated by token."""
+
+    def handler(request):
+        payload = json.loads(request.content)
+        start = int(payload.get("nextPageToken") or 0)
+        end = min(start + payload.get("maxResults", 50), count)
+
+        page = {"issues": [make_issue(i) for i in range(start, end)], "isLast": end >= count}
+        if end < count:
+            page["nextPageToken"] = str(end)
+
+        return httpx.Response(200, json=page)
+
+    return handler
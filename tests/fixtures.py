@@ -0,0 +1,123 @@
+"""Synthetic Jira API payloads shared by the tests and benchmarks."""
+
+
+def adf_document(i, paragraphs=3):
+    """An ADF document with the node types Jira commonly returns in descriptions and comments."""
+    content = []
+
+    for p in range(paragraphs):
+        content.append(
+            {
+                "type": "paragraph",
+                "content": [
+                    {"type": "text", "text": f"Paragraph {p} of issue {i}, "},
+                    {"type": "text", "text": "bold", "marks": [{"type": "strong"}]},
+                    {"type": "mention", "attrs": {"id": "a1", "text": "@Alice"}},
+                    {"type": "hardBreak"},
+                    {"type": "inlineCard", "attrs": {"url": f"https://example.com/{i}/{p}"}},
+                    {"type": "emoji", "attrs": {"shortName": ":smile:", "text": "😄"}},
+                ],
+            }
+        )
+
+    content += [
+        {"type": "codeBlock", "attrs": {"language": "python"}, "content": [{"type": "text", "text": "print(1)"}]},
+        {
+            "type": "bulletList",
+            "content": [
+                {"type": "listItem", "content": [{"type": "paragraph", "content": [{"type": "text", "text": "one"}]}]},
+                {"type": "listItem", "content": [{"type": "paragraph", "content": [{"type": "text", "text": "two"}]}]},
+            ],
+        },
+    ]
+
+    return {"type": "doc", "version": 1, "content": content}
+
+
+def user(account_id):
+    return {
+        "self": f"https://example.atlassian.net/rest/api/3/user?accountId={account_id}",
+        "accountId": account_id,
+        "emailAddress": f"{account_id}@example.com",
+        "avatarUrls": {size: f"https://avatar/{account_id}/{size}" for size in ("48x48", "24x24", "16x16", "32x32")},
+        "displayName": f"User {account_id}",
+        "active": True,
+        "timeZone": "Europe/Prague",
+        "accountType": "atlassian",
+    }
+
+
+def changelog_history(i, k):
+    return {
+        "id": f"{i}{k:03d}",
+        "author": user("a1"),
+        "created": "2024-01-01T10:00:00.000+0000",
+        "items": [
+            {"field": "status", "fieldtype": "jira", "from": "1", "fromString": "Open", "to": "2", "toString": "Done"},
+            {"field": "assignee", "fieldtype": "jira", "from": None, "fromString": None, "to": "a2", "toString": "B"},
+        ],
+    }
+
+
+def issue(i, custom_fields=60, histories=0, description_paragraphs=3):
+    """
+    An issue as returned by the issue search, with `custom_fields` nested custom fields and `histories` changelog
+    entries, or no changelog if 0.
+    """
+    fields = {
+        "summary": f"Issue {i}",
+        "description": adf_document(i, description_paragraphs),
+        "created": "2023-12-01T00:00:00.000+0000",
+        "updated": f"2024-01-{1 + i % 28:02d}T10:00:00.000+0000",
+        "statuscategorychangedate": "2024-01-01T10:00:00.000+0000",
+        "duedate": "2024-02-01",
+        "issuetype": {"self": "https://x/issuetype/1", "id": "1", "name": "Bug", "subtask": False, "iconUrl": "x"},
+        "project": {"self": "https://x/project/1", "id": "1", "key": "P", "name": "Project", "avatarUrls": {}},
+        "status": {"self": "https://x/status/3", "id": "3", "name": "Open", "statusCategory": {"id": 2, "key": "new"}},
+        "priority": {"self": "https://x/priority/2", "id": "2", "name": "High", "iconUrl": "x"},
+        "assignee": user("a1") if i % 2 else None,
+        "creator": user("a2"),
+        "reporter": user("a2"),
+        "labels": ["backend", f"label-{i % 5}"],
+        "components": [{"self": "https://x/component/1", "id": "1", "name": "core"}],
+        "fixVersions": [],
+        "versions": [],
+        "subtasks": [],
+        "issuelinks": [],
+        "parent": {"id": "5", "key": "P-5", "fields": {"summary": "Parent", "status": {"name": "Open"}}},
+        "progress": {"progress": 0, "total": 3600},
+        "aggregateprogress": {"progress": 0, "total": 3600},
+        "timespent": None,
+        "timeoriginalestimate": 3600,
+        "watches": {"self": "https://x/watchers", "watchCount": 1, "isWatching": False},
+        "votes": {"self": "https://x/votes", "votes": 0, "hasVoted": False},
+    }
+
+    for k in range(custom_fields):
+        if k % 3 == 0:
+            fields[f"customfield_{10000 + k}"] = {"self": f"https://x/option/{k}", "value": f"Option {k}", "id": str(k)}
+        elif k % 3 == 1:
+            fields[f"customfield_{10000 + k}"] = [{"value": "a", "id": "1", "child": {"value": "b", "id": "2"}}]
+        else:
+            fields[f"customfield_{10000 + k}"] = None if i % 2 else k * 1.5
+
+    result = {"expand": "renderedFields", "id": str(10000 + i), "self": f"https://x/issue/{10000 + i}",
+              "key": f"P-{i}", "fields": fields}
+
+    if histories:
+        result["changelog"] = {
+            "startAt": 0,
+            "maxResults": histories,
+            "total": histories,
+            "histories": [changelog_history(i, k) for k in range(histories)],
+        }
+
+    return result
+
+
+def search_page(issues, next_page_token=None):
+    """A page of the enhanced JQL search (search/jql)."""
+    page = {"issues": issues, "isLast": next_page_token is None}
+    if next_page_token is not None:
+        page["nextPageToken"] = next_page_token
+    return page
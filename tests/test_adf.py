@@ -0,0 +1,138 @@
+import random
+import unittest
+
+from adf import COMMENT_RENDERER, DESCRIPTION_RENDERER
+from tests.fixtures import adf_document
+
+
+def parse_description(description) -> str:
+    # the recursive renderer of descriptions and worklog comments the component used before AdfRenderer
+    if description is None:
+        return ""
+    text = ""
+
+    if "content" in description:
+        text += parse_description(description["content"])
+
+        if description["type"] == "paragraph":
+            text += "\n"
+
+    elif isinstance(description, dict):
+        if description["type"] == "inlineCard" or description["type"] == "blockCard":
+            text += description.get("attrs", {}).get("url", "")
+        elif description["type"] == "text":
+            text += description.get("text", "")
+        elif description["type"] == "hardBreak":
+            text += "\n"
+        elif description["type"] == "mention":
+            text += description.get("attrs", {}).get("text", "")
+        elif description["type"] == "status":
+            text += description.get("attrs", {}).get("text", "")
+        elif description["type"] in ("codeBlock", "media"):
+            pass
+        else:
+            text += ""
+
+    elif isinstance(description, list):
+        for list_item in description:
+            text += parse_description(list_item)
+
+    else:
+        pass
+
+    return text
+
+
+def merge_text_and_mentions(data):
+    # the renderer of comment bodies the component used before AdfRenderer
+    merged_string = ""
+
+    content_list = data.get("body", {}).get("content", [])
+
+    for content in content_list:
+        if content.get("type") == "paragraph":
+            for c in content.get("content", []):
+                if c.get("type") == "text":
+                    merged_string += c.get("text", "")
+                elif c.get("type") == "mention":
+                    merged_string += c.get("attrs", {}).get("text", "")
+
+    return merged_string
+
+
+# as in ADF, only block nodes have content, inline nodes and leaves never do
+BLOCK_TYPES = [
+    "paragraph", "codeBlock", "mediaSingle", "bulletList", "orderedList", "listItem", "heading", "table", "tableRow",
+    "tableCell", "panel", "blockquote", "unknownBlock",
+]
+LEAF_TYPES = ["text", "hardBreak", "mention", "status", "inlineCard", "blockCard", "media", "emoji", "rule", "unknown"]
+
+
+def random_node(rnd, depth):
+    node = {"type": rnd.choice(BLOCK_TYPES + LEAF_TYPES)}
+
+    if rnd.random() < 0.7:
+        node["attrs"] = {}
+        if rnd.random() < 0.7:
+            node["attrs"]["text"] = rnd.choice(["@Alice", "IN PROGRESS", "", "a\nb"])
+        if rnd.random() < 0.5:
+            node["attrs"]["url"] = f"https://example.com/{rnd.randint(0, 99)}"
+
+    if rnd.random() < 0.7:
+        node["text"] = rnd.choice(["plain ", "ünicode ", "", "\0", "line\n"])
+
+    if node["type"] in BLOCK_TYPES and depth < 6 and rnd.random() < 0.8:
+        node["content"] = [random_node(rnd, depth + 1) for _ in range(rnd.randint(0, 4))]
+
+    return node
+
+
+def random_document(rnd):
+    return {"type": "doc", "version": 1, "content": [random_node(rnd, 1) for _ in range(rnd.randint(0, 5))]}
+
+
+def nested_document(depth):
+    """A document with `depth` nested block quotes around a single paragraph, built without recursion."""
+    node = {"type": "paragraph", "content": [{"type": "text", "text": "deep"}]}
+    for _ in range(depth):
+        node = {"type": "blockquote", "content": [node]}
+    return {"type": "doc", "content": [node]}
+
+
+class TestDescriptionRenderer(unittest.TestCase):
+    def test_matches_parse_description(self):
+        rnd = random.Random(10)
+
+        for _ in range(2000):
+            document = random_document(rnd)
+            with self.subTest(document=document):
+                self.assertEqual(DESCRIPTION_RENDERER.render(document), parse_description(document))
+
+    def test_matches_parse_description_on_fixture(self):
+        document = adf_document(1, paragraphs=5)
+        self.assertEqual(DESCRIPTION_RENDERER.render(document), parse_description(document))
+
+    def test_empty_values(self):
+        for value in (None, "", [], {"type": "doc", "content": []}):
+            with self.subTest(value=value):
+                self.assertEqual(DESCRIPTION_RENDERER.render(value), parse_description(value))
+
+    def test_deep_nesting(self):
+        self.assertEqual(DESCRIPTION_RENDERER.render(nested_document(100000)), "deep\n")
+
+
+class TestCommentRenderer(unittest.TestCase):
+    def test_matches_merge_text_and_mentions(self):
+        rnd = random.Random(11)
+
+        for _ in range(2000):
+            comment = {"body": random_document(rnd)}
+            with self.subTest(comment=comment):
+                self.assertEqual(COMMENT_RENDERER.render(comment["body"]), merge_text_and_mentions(comment))
+
+    def test_deep_nesting(self):
+        self.assertEqual(COMMENT_RENDERER.render(nested_document(100000)), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
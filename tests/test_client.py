@@ -0,0 +1,96 @@
+import asyncio
+import math
+import unittest
+from urllib.parse import urljoin
+
+from client import PAGINATION_PREFETCH
+from tests.fake_jira import FakeJira, offset_pages
+
+
+def get_values(js):
+    return js if isinstance(js, list) else js["values"]
+
+
+class TestPaginate(unittest.IsolatedAsyncioTestCase):
+    async def paginate(self, fake, page_size=100, **kwargs):
+        jira = fake.client()
+        pages = jira.paginate(urljoin(jira.param_base_url, "items"), page_size, get_values, "Error. ", **kwargs)
+        return [page async for page in pages]
+
+    def requested_offsets(self, fake):
+        return sorted(int(request.url.params["startAt"]) for request in fake.requests)
+
+    async def test_ends_on_each_marker(self):
+        for end in ("isLast", "isLastPage", "total", "short"):
+            # with 300 items the last page is full, so only the marker or an empty page tells it is the last one
+            for count in (0, 1, 99, 100, 250, 300):
+                with self.subTest(end=end, count=count):
+                    fake = FakeJira(latency=0.001)
+                    fake.route("/items", offset_pages(count, lambda i: i, end=end))
+
+                    pages = await self.paginate(fake)
+
+                    self.assertEqual([item for page in pages for item in page], list(range(count)))
+                    self.assertTrue(all(pages[:-1]), "only the last page may be empty")
+
+    async def test_total_requests_no_page_behind_the_end(self):
+        fake = FakeJira(latency=0.001)
+        fake.route("/items", offset_pages(1000, lambda i: i, end="total"))
+
+        await self.paginate(fake)
+
+        self.assertEqual(self.requested_offsets(fake), list(range(0, 1000, 100)))
+
+    async def test_speculative_pages_are_limited_by_prefetch(self):
+        for end in ("isLast", "isLastPage", "short"):
+            with self.subTest(end=end):
+                fake = FakeJira(latency=0.001)
+                fake.route("/items", offset_pages(1000, lambda i: i, end=end))
+
+                await self.paginate(fake)
+
+                # an empty page is needed to find the end of a plain list of 1000 items
+                pages = math.ceil(1000 / 100) + (end == "short")
+                self.assertGreaterEqual(len(fake.requests), pages)
+                self.assertLessEqual(len(fake.requests), pages + PAGINATION_PREFETCH - 1)
+                self.assertEqual(len(set(self.requested_offsets(fake))), len(fake.requests))
+
+    async def test_prefetches_pages_ahead(self):
+        fake = FakeJira(latency=0.02)
+        fake.route("/items", offset_pages(2000, lambda i: i, end="isLast"))
+
+        pages = await self.paginate(fake, prefetch=3)
+
+        self.assertEqual(len(pages), 20)
+        self.assertEqual(fake.max_in_flight, 3)
+
+    async def test_follows_page_size_of_server(self):
+        for end in ("isLast", "isLastPage", "total"):
+            with self.subTest(end=end):
+                fake = FakeJira(latency=0.001)
+                fake.route("/items", offset_pages(250, lambda i: i, end=end, max_page_size=30))
+
+                pages = await self.paginate(fake, page_size=100)
+
+                self.assertEqual([item for page in pages for item in page], list(range(250)))
+                self.assertTrue(all(offset % 30 == 0 for offset in self.requested_offsets(fake)))
+
+    async def test_stopping_early_cancels_prefetched_pages(self):
+        fake = FakeJira(latency=0.02)
+        fake.route("/items", offset_pages(10000, lambda i: i, end="isLast"))
+        jira = fake.client()
+
+        pages = jira.paginate(urljoin(jira.param_base_url, "items"), 100, get_values, "Error. ")
+        async for page in pages:
+            if page[0] >= 200:
+                break
+        await pages.aclose()
+        # cancelled requests finish on the next iteration of the event loop
+        await asyncio.sleep(0)
+
+        self.assertLessEqual(len(fake.requests), 3 + PAGINATION_PREFETCH)
+        self.assertEqual(fake.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+
+from component import (
+    KEY_STATE_ISSUES_UPDATED, KEY_STATE_SINCE, KEY_STATE_WORKLOGS_UPDATED, STATE_OVERLAP, JiraComponent,
+)
+from tests.fake_jira import fake_component
+
+
+def comment(issue_id="10001", comment_id=10, properties=None):
+    result = {
+        "id": str(comment_id),
+        "self": f"https://example.atlassian.net/rest/api/3/issue/{issue_id}/comment/{comment_id}",
+        "author": {"accountId": "a1", "displayName": "Alice", "active": True, "accountType": "atlassian"},
+        "body": {"type": "doc", "content": [{"type": "paragraph", "content": [{"type": "text", "text": "Hi"}]}]},
+        "created": "2024-01-01T10:00:00.000+0000",
+        "updated": "2024-01-01T10:00:00.000+0000",
+    }
+    if properties is not None:
+        result["properties"] = properties
+    return result
+
+
+INTERNAL = [{"key": "sd.public.comment", "value": {"internal": True}}]
+
+
+class TestParseComments(unittest.TestCase):
+    def setUp(self):
+        # parse_comments does not depend on the configuration
+        self.component = JiraComponent.__new__(JiraComponent)
+
+    def test_public_visibility_from_properties(self):
+        for properties, expected in [(None, True), ([], True), (INTERNAL, False)]:
+            with self.subTest(properties=properties):
+                row, = self.component.parse_comments([comment(properties=properties)])
+                self.assertEqual(row["public_visibility"], expected)
+                self.assertEqual(row["issue_id"], "10001")
+                self.assertEqual(row["text"], "Hi")
+
+    def test_public_visibility_unknown_without_properties(self):
+        # comments embedded in the issue search are not expanded with properties, internal ones must not look public
+        for properties in (None, INTERNAL):
+            with self.subTest(properties=properties):
+                row, = self.component.parse_comments([comment(properties=properties)], with_properties=False)
+                self.assertIsNone(row["public_visibility"])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+def issue(updated):
+    return {"id": "10001", "key": "TEST-1", "fields": {"updated": updated}}
+
+
+class TestIncrementalState(unittest.TestCase):
+    SINCE = "2024-01-01"
+    OVERLAP_MS = int(STATE_OVERLAP.total_seconds() * 1000)
+
+    def state(self, **marks):
+        return {KEY_STATE_SINCE: self.SINCE, **marks}
+
+    def test_issues_resume_before_stored_mark(self):
+        state = self.state(**{KEY_STATE_ISSUES_UPDATED: "2024-03-01T12:00:00.000+0000"})
+        with fake_component(state=state, since=self.SINCE) as jira:
+            self.assertEqual(jira.get_issues_since(), "2024-03-01 11:45")
+
+    def test_issues_resume_no_earlier_than_since(self):
+        state = self.state(**{KEY_STATE_ISSUES_UPDATED: "2024-01-01T00:05:00.000+0000"})
+        with fake_component(state=state, since=self.SINCE) as jira:
+            self.assertEqual(jira.get_issues_since(), "2024-01-01")
+
+    def test_worklogs_resume_before_stored_mark(self):
+        with fake_component(since=self.SINCE) as jira:
+            until = jira.param_since_unix + 10 * self.OVERLAP_MS
+
+        with fake_component(state=self.state(**{KEY_STATE_WORKLOGS_UPDATED: until}), since=self.SINCE) as jira:
+            self.assertEqual(jira.get_worklogs_since(KEY_STATE_WORKLOGS_UPDATED), until - self.OVERLAP_MS)
+
+    def test_worklogs_resume_no_earlier_than_since(self):
+        with fake_component(since=self.SINCE) as jira:
+            until = jira.param_since_unix + self.OVERLAP_MS // 2
+
+        with fake_component(state=self.state(**{KEY_STATE_WORKLOGS_UPDATED: until}), since=self.SINCE) as jira:
+            self.assertEqual(jira.get_worklogs_since(KEY_STATE_WORKLOGS_UPDATED), jira.param_since_unix)
+
+    def test_state_reset_when_since_changes(self):
+        state = {
+            KEY_STATE_SINCE: "2023-01-01",
+            KEY_STATE_ISSUES_UPDATED: "2024-03-01T12:00:00.000+0000",
+            KEY_STATE_WORKLOGS_UPDATED: 1709294400000,
+        }
+        with fake_component(state=state, since=self.SINCE) as jira:
+            self.assertEqual(jira.state, {})
+            self.assertEqual(jira.new_state, {KEY_STATE_SINCE: self.SINCE})
+            self.assertEqual(jira.get_issues_since(), "2024-01-01")
+            self.assertEqual(jira.get_worklogs_since(KEY_STATE_WORKLOGS_UPDATED), jira.param_since_unix)
+
+    def test_state_ignored_when_not_incremental(self):
+        state = self.state(**{KEY_STATE_ISSUES_UPDATED: "2024-03-01T12:00:00.000+0000"})
+        with fake_component(state=state, since=self.SINCE, incremental=0) as jira:
+            self.assertEqual(jira.state, {})
+            self.assertEqual(jira.get_issues_since(), "2024-01-01")
+
+    def test_issues_mark_advances_to_latest_update(self):
+        state = self.state(**{KEY_STATE_ISSUES_UPDATED: "2024-03-01T12:00:00.000+0000"})
+        with fake_component(state=state, since=self.SINCE) as jira:
+            jira.update_issues_state([
+                issue("2024-03-02T08:00:00.000+0000"),
+                issue("2024-03-03T08:00:00.000+0000"),
+                issue("2024-02-01T08:00:00.000+0000"),
+            ])
+            self.assertEqual(jira.new_state[KEY_STATE_ISSUES_UPDATED], "2024-03-03T08:00:00.000+0000")
+
+    def test_issues_mark_compares_timezones(self):
+        state = self.state(**{KEY_STATE_ISSUES_UPDATED: "2024-03-01T12:00:00.000+0000"})
+        with fake_component(state=state, since=self.SINCE) as jira:
+            # 13:00 in UTC+2 is before 12:00 UTC
+            jira.update_issues_state([issue("2024-03-01T13:00:00.000+0200")])
+            self.assertEqual(jira.new_state[KEY_STATE_ISSUES_UPDATED], "2024-03-01T12:00:00.000+0000")
+
+    def test_marks_kept_when_run_returns_no_rows(self):
+        state = self.state(**{
+            KEY_STATE_ISSUES_UPDATED: "2024-03-01T12:00:00.000+0000",
+            KEY_STATE_WORKLOGS_UPDATED: 1709294400000,
+        })
+        with fake_component(state=state, since=self.SINCE) as jira:
+            jira.update_issues_state([])
+            jira.update_issues_state([{"id": "10001", "key": "TEST-1", "fields": {}}])
+            self.assertEqual(jira.new_state, state)
@@ -0,0 +1,84 @@
+import asyncio
+import gc
+import unittest
+
+from concurrency import map_unordered, merge, prefetch
+
+
+async def aiter_of(items):
+    for item in items:
+        yield item
+
+
+class TestMapUnordered(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # the event loop reports tasks destroyed while pending and exceptions nobody retrieved to this handler
+        self.loop_errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: self.loop_errors.append(context))
+        self.started = []
+
+    async def assertNoTaskLeft(self):
+        await asyncio.sleep(0)
+        gc.collect()
+        await asyncio.sleep(0)
+        self.assertEqual([t for t in self.started if not t.done()], [])
+        self.assertEqual(self.loop_errors, [])
+
+    async def call(self, item):
+        self.started.append(asyncio.current_task())
+        if item < 0:
+            raise ValueError(item)
+        await asyncio.sleep(item)
+        return item
+
+    async def test_results_of_all_items(self):
+        for items in ([0.01, 0, 0.02, 0], aiter_of([0.01, 0, 0.02, 0])):
+            with self.subTest(items=items):
+                results = [r async for r in map_unordered(self.call, items, 2)]
+                self.assertEqual(sorted(results), [(0, 0), (0, 0), (0.01, 0.01), (0.02, 0.02)])
+
+    async def test_early_exit_cancels_and_awaits_pending_calls(self):
+        for items in ([0, 10, 10, 10], aiter_of([0, 10, 10, 10])):
+            with self.subTest(items=items):
+                results = map_unordered(self.call, items, 4)
+                async for _ in results:
+                    break
+                await results.aclose()
+
+                await self.assertNoTaskLeft()
+
+    async def test_error_retrieves_exceptions_of_other_failed_calls(self):
+        for items in ([-1, -2, -3, 10], aiter_of([-1, -2, -3, 10])):
+            with self.subTest(items=items):
+                with self.assertRaises(ValueError):
+                    async for _ in map_unordered(self.call, items, 4):
+                        pass
+
+                await self.assertNoTaskLeft()
+
+
+async def endless():
+    while True:
+        await asyncio.sleep(0)
+        yield 1
+
+
+class TestMerge(unittest.IsolatedAsyncioTestCase):
+    async def test_early_exit_awaits_producer(self):
+        loop_errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: loop_errors.append(context))
+
+        for items in (merge([endless(), endless()], 2, 2), prefetch(endless(), 2)):
+            with self.subTest(items=items):
+                async for _ in items:
+                    break
+                await items.aclose()
+
+                gc.collect()
+                await asyncio.sleep(0)
+                self.assertEqual(loop_errors, [])
+                self.assertEqual(asyncio.all_tasks(), {asyncio.current_task()})
+
+
+if __name__ == "__main__":
+    unittest.main()
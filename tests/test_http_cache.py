@@ -0,0 +1,148 @@
+import json
+import os
+import tempfile
+import unittest
+
+import httpx
+from keboola.component import UserException
+
+from tests.fake_jira import FakeJira
+
+FIELDS = [{"id": "summary", "name": "Summary"}]
+ETAG = '"v1"'
+LAST_MODIFIED = "Mon, 01 Jan 2024 10:00:00 GMT"
+
+
+class FieldsServer:
+    """The field endpoint with validators, answering 304 to a request with the current ETag."""
+
+    def __init__(self):
+        self.fields = FIELDS
+        self.etag = ETAG
+        self.status_code = 200
+
+    def handle(self, request):
+        if self.status_code != 200:
+            return httpx.Response(self.status_code, text="Not found")
+
+        if request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304)
+
+        headers = {"ETag": self.etag, "Last-Modified": LAST_MODIFIED, "Content-Type": "application/json"}
+        return httpx.Response(200, headers=headers, json=self.fields)
+
+
+class TestResponseCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.server = FieldsServer()
+        self.fake = FakeJira()
+        self.fake.route("/field", self.server.handle)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def client(self, ttls=None):
+        return self.fake.client(cache_directory=self.directory.name, cache_ttls=ttls)
+
+    def entries(self):
+        return sorted(os.listdir(self.directory.name))
+
+    def stored_meta(self):
+        meta_file, = [f for f in self.entries() if f.endswith(".json")]
+        with open(os.path.join(self.directory.name, meta_file)) as file:
+            return json.load(file)
+
+    def age_entries(self, seconds):
+        meta = self.stored_meta()
+        meta["stored_at"] -= seconds
+        meta_file, = [f for f in self.entries() if f.endswith(".json")]
+        with open(os.path.join(self.directory.name, meta_file), "w") as file:
+            json.dump(meta, file)
+
+    async def test_miss_stores_response(self):
+        jira = self.client()
+
+        self.assertEqual(await jira.get_fields(), FIELDS)
+
+        self.assertEqual(len(self.fake.requests), 1)
+        self.assertEqual(jira.response_cache.stats, {"hits": 0, "revalidated": 0, "misses": 1})
+        self.assertEqual(len(self.entries()), 2)
+        self.assertEqual(self.stored_meta()["headers"]["etag"], ETAG)
+
+    async def test_fresh_hit_sends_no_request(self):
+        await self.client().get_fields()
+
+        # a new client, as in the next run
+        jira = self.client()
+        self.assertEqual(await jira.get_fields(), FIELDS)
+
+        self.assertEqual(len(self.fake.requests), 1)
+        self.assertEqual(jira.response_cache.stats, {"hits": 1, "revalidated": 0, "misses": 0})
+
+    async def test_stale_entry_is_revalidated_and_304_reuses_body(self):
+        await self.client().get_fields()
+        self.age_entries(48 * 3600)
+        stale_stored_at = self.stored_meta()["stored_at"]
+
+        jira = self.client()
+        self.assertEqual(await jira.get_fields(), FIELDS)
+
+        request = self.fake.requests[-1]
+        self.assertEqual(request.headers["If-None-Match"], ETAG)
+        self.assertEqual(request.headers["If-Modified-Since"], LAST_MODIFIED)
+        self.assertEqual(jira.response_cache.stats, {"hits": 0, "revalidated": 1, "misses": 0})
+        # touched, so the entry is fresh again for the next run
+        self.assertGreater(self.stored_meta()["stored_at"], stale_stored_at + 47 * 3600)
+
+        self.assertEqual(await self.client().get_fields(), FIELDS)
+        self.assertEqual(len(self.fake.requests), 2)
+
+    async def test_changed_data_replaces_entry(self):
+        await self.client().get_fields()
+        self.age_entries(48 * 3600)
+        self.server.fields = [{"id": "labels", "name": "Labels"}]
+        self.server.etag = '"v2"'
+
+        jira = self.client()
+        self.assertEqual(await jira.get_fields(), self.server.fields)
+
+        self.assertEqual(jira.response_cache.stats, {"hits": 0, "revalidated": 0, "misses": 1})
+        self.assertEqual(self.stored_meta()["headers"]["etag"], '"v2"')
+        self.assertEqual(await self.client().get_fields(), self.server.fields)
+        self.assertEqual(len(self.fake.requests), 2)
+
+    async def test_error_response_is_not_stored(self):
+        self.server.status_code = 404
+
+        with self.assertRaises(UserException):
+            await self.client().get_fields()
+
+        self.assertEqual(self.entries(), [])
+
+    async def test_ttl_override(self):
+        await self.client().get_fields()
+
+        # 0 always revalidates, even an entry stored just now
+        jira = self.client(ttls={"fields": 0})
+        await jira.get_fields()
+
+        self.assertEqual(len(self.fake.requests), 2)
+        self.assertIn("If-None-Match", self.fake.requests[-1].headers)
+        self.assertEqual(jira.response_cache.stats, {"hits": 0, "revalidated": 1, "misses": 0})
+
+        # the other endpoints keep their defaults
+        self.assertEqual(jira.response_cache.ttls["projects"], 24 * 3600)
+
+    async def test_requests_without_cache_endpoint_are_not_cached(self):
+        jira = self.client()
+
+        for _ in range(2):
+            await jira.get_raw(endpoint=jira.param_base_url + "field")
+
+        self.assertEqual(len(self.fake.requests), 2)
+        self.assertEqual(self.entries(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from issue_cache import IssueRowCache
+
+
+def row(issue_id, updated="2024-01-01", size=100):
+    return {"id": issue_id, "updated": updated, "summary": "x" * size}
+
+
+class TestIssueRowCache(unittest.TestCase):
+    def test_serves_rows_with_the_same_update_time(self):
+        cache = IssueRowCache(2 ** 20)
+        cache.put(row("1"))
+
+        self.assertEqual(cache.get("1", "2024-01-01"), row("1"))
+        self.assertIsNone(cache.get("1", "2024-01-02"))
+        self.assertIsNone(cache.get("2", "2024-01-01"))
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_repeated_lookup_counts_one_miss(self):
+        cache = IssueRowCache(2 ** 20)
+
+        self.assertIsNone(cache.get("1", "2024-01-01", count_miss=False))
+        self.assertIsNone(cache.get("1", "2024-01-01"))
+        self.assertEqual(cache.misses, 1)
+
+    def test_evicts_least_recently_used_rows_over_max_bytes(self):
+        size = IssueRowCache.row_size(row("1"))
+        cache = IssueRowCache(3 * size)
+        for issue_id in ("1", "2", "3"):
+            cache.put(row(issue_id))
+
+        cache.get("1", "2024-01-01")
+        cache.put(row("4"))
+
+        self.assertEqual(list(cache.rows), ["3", "1", "4"])
+        self.assertEqual(cache.size, 3 * size)
+        self.assertEqual(cache.evicted, 1)
+
+    def test_replacing_row_updates_size(self):
+        cache = IssueRowCache(2 ** 20)
+        cache.put(row("1", size=100))
+        cache.put(row("1", size=1000))
+
+        self.assertEqual(cache.size, IssueRowCache.row_size(row("1", size=1000)))
+
+    def test_row_larger_than_cache_is_not_kept(self):
+        cache = IssueRowCache(IssueRowCache.row_size(row("1")))
+        cache.put(row("1"))
+        cache.put(row("2", size=10000))
+
+        self.assertEqual(list(cache.rows), ["1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
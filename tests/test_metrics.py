@@ -0,0 +1,173 @@
+import asyncio
+import csv
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+import httpx
+
+from metrics import LATENCY_BUCKETS, LatencyHistogram, Metrics
+from result import FIELDS_RUN_METRICS, JiraWriter
+from tests.fake_jira import FakeJira, fake_component
+
+FIELDS = [{"id": "summary"}]
+PROJECTS = [{"id": "1", "key": "P"}]
+
+
+def fail_first(status_code, body):
+    """Handler answering its first request with `status_code` and all the others with `body`."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(status_code, headers={"Retry-After": "0"}, text="Try again")
+        return httpx.Response(200, json=body)
+
+    return handler
+
+
+def serve(fake):
+    fake.route("/field", lambda request: httpx.Response(200, json=FIELDS))
+    fake.route("/project", fail_first(429, PROJECTS))
+    fake.route("/comment", fail_first(503, {"comments": []}))
+
+
+async def download(jira):
+    await jira.get_fields()
+    await jira.get_comments("10001")
+    await jira.get_comments("10002")
+    # last, so the requests are not slowed down by the throttled one
+    await jira.get_projects()
+
+
+class TestMetrics(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        logging.disable(logging.WARNING)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    async def test_report_of_requests_recorded_by_event_hooks(self):
+        fake = FakeJira(latency=0.01)
+        serve(fake)
+        metrics = Metrics()
+
+        await download(fake.client(metrics=metrics))
+        report = metrics.report()
+
+        self.assertEqual(report["requests"], len(fake.requests))
+        self.assertEqual(report["requests"], 6)
+        self.assertEqual(set(report["endpoints"]), {
+            "GET /rest/api/3/field", "GET /rest/api/3/project", "GET /rest/api/3/issue/{id}/comment",
+        })
+
+        fields = report["endpoints"]["GET /rest/api/3/field"]
+        self.assertEqual(fields["requests"], 1)
+        self.assertEqual(fields["bytes"], len(json.dumps(FIELDS, separators=(",", ":"))))
+        self.assertEqual(fields["status_codes"], {200: 1})
+
+        projects = report["endpoints"]["GET /rest/api/3/project"]
+        self.assertEqual(projects["requests"], 2)
+        self.assertEqual(projects["throttled_responses"], 1)
+        self.assertEqual(projects["retried_responses"], 1)
+        self.assertEqual(projects["status_codes"], {200: 1, 429: 1})
+
+        # both issues are counted under one endpoint, the 503 was retried by the client
+        comments = report["endpoints"]["GET /rest/api/3/issue/{id}/comment"]
+        self.assertEqual(comments["requests"], 3)
+        self.assertEqual(comments["failed_requests"], 0)
+        self.assertEqual(comments["retried_responses"], 1)
+        self.assertEqual(comments["throttled_responses"], 0)
+        self.assertEqual(comments["status_codes"], {200: 2, 503: 1})
+
+        latency = comments["latency"]
+        self.assertEqual(sum(latency["buckets"].values()), 3)
+        self.assertGreaterEqual(latency["max_seconds"], 0.01)
+        self.assertGreaterEqual(latency["max_seconds"], latency["mean_seconds"])
+
+        self.assertEqual(report["bytes"], sum(e["bytes"] for e in report["endpoints"].values()))
+
+    async def test_dataset_wall_time(self):
+        metrics = Metrics()
+
+        await metrics.timed("users", asyncio.sleep(0.02))
+        await metrics.timed("users", asyncio.sleep(0.02))
+
+        self.assertGreaterEqual(metrics.report()["datasets"]["users"], 0.04)
+
+    def test_table_metrics_of_writer(self):
+        metrics = Metrics()
+        with tempfile.TemporaryDirectory() as directory:
+            writer = JiraWriter(directory, "fields", True, metrics=metrics)
+            writer.writerows([{"id": "summary", "name": "Summary"}, {"id": "labels", "name": "Labels"}])
+            writer.close()
+
+        table = metrics.report()["tables"]["fields"]
+        self.assertEqual(table["rows"], 2)
+        self.assertEqual(set(table), {"rows", "parse_seconds", "flatten_seconds", "write_seconds"})
+
+        rows = list(metrics.rows())
+        self.assertIn(("table", "fields", "rows", 2), rows)
+
+    def test_latency_buckets(self):
+        histogram = LatencyHistogram()
+        for seconds in (0.01, 0.05, 0.3, 100):
+            histogram.add(seconds)
+
+        result = histogram.to_dict()
+        self.assertEqual(result["buckets"], {"<=0.05s": 2, "<=0.5s": 1, f">{LATENCY_BUCKETS[-1]}s": 1})
+        self.assertEqual(result["max_seconds"], 100)
+        self.assertAlmostEqual(result["mean_seconds"], 100.36 / 4, places=3)
+
+
+class TestPerformanceReport(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.WARNING)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_metrics_table_and_log(self):
+        fake = FakeJira()
+        serve(fake)
+
+        with fake_component(fake, metrics_table=True) as jira:
+            asyncio.run(download(jira.client))
+
+            logging.disable(logging.NOTSET)
+            with self.assertLogs(level=logging.DEBUG) as logs:
+                jira.write_performance_report()
+
+            path = os.path.join(jira.tables_out_path, "run-metrics.csv")
+            with open(path) as table_file:
+                rows = list(csv.reader(table_file))
+            with open(path + ".manifest") as manifest_file:
+                manifest = json.load(manifest_file)
+
+        summary, = [r for r in logs.records if r.levelno == logging.INFO]
+        self.assertIn("6 requests", summary.getMessage())
+        self.assertIn("1 throttled responses", summary.getMessage())
+        self.assertLess(len(summary.getMessage()), 200)
+        report, = [r for r in logs.records if r.levelno == logging.DEBUG and "Performance report" in r.getMessage()]
+        self.assertIn('"rate_limiter"', report.getMessage())
+
+        self.assertEqual(len({row[0] for row in rows}), 1)
+        metrics = {tuple(row[1:4]): row[4] for row in rows}
+        self.assertEqual(metrics[("endpoint", "GET /rest/api/3/project", "throttled_responses")], "1")
+        self.assertEqual(metrics[("endpoint", "GET /rest/api/3/issue/{id}/comment", "retried_responses")], "1")
+        self.assertEqual(metrics[("endpoint", "GET /rest/api/3/issue/{id}/comment", "requests")], "3")
+        self.assertIn(("endpoint", "GET /rest/api/3/field", "latency_mean_seconds"), metrics)
+
+        self.assertEqual(manifest["incremental"], True)
+        self.assertEqual([column["name"] for column in manifest["schema"]], FIELDS_RUN_METRICS)
+        self.assertEqual(
+            [column["name"] for column in manifest["schema"] if column.get("primary_key")],
+            ["run_started", "category", "name", "metric"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
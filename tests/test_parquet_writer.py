@@ -0,0 +1,76 @@
+import datetime
+import json
+import os
+import tempfile
+import unittest
+
+from parquet_writer import ParquetWriter
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+def worklog(i, time_spent_seconds=3600):
+    return {
+        "id": str(i),
+        "issueId": "10001",
+        "author": {"accountId": "a1", "displayName": "Alice"},
+        "created": "2024-01-01T10:00:00.000+0000",
+        "updated": "2024-01-02T10:00:00.000+0000",
+        "started": "2024-01-01T08:00:00.000+0000",
+        "timeSpent": "1h",
+        "timeSpentSeconds": time_spent_seconds,
+        "comment": "",
+    }
+
+
+@unittest.skipIf(pq is None, "pyarrow is not installed")
+class TestParquetWriter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "worklogs.parquet")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, rows, **kwargs):
+        writer = ParquetWriter(self.directory.name, "worklogs", incremental=True, **kwargs)
+        writer.writerows(rows)
+        writer.close()
+        return writer
+
+    def test_typed_columns(self):
+        writer = self.write([worklog(1), worklog(2, time_spent_seconds="not a number")])
+
+        table = pq.read_table(self.path)
+        self.assertEqual(table.column_names[:3], ["id", "issue_id", "author_account_id"])
+        self.assertEqual(str(table.schema.field("time_spent_seconds").type), "int64")
+        self.assertEqual(table.column("time_spent_seconds").to_pylist(), [3600, None])
+        self.assertEqual(
+            table.column("created").to_pylist()[0],
+            datetime.datetime(2024, 1, 1, 10, tzinfo=datetime.timezone.utc),
+        )
+        # empty strings stay empty in string columns, as in the CSV files
+        self.assertEqual(table.column("comment").to_pylist(), ["", ""])
+        self.assertEqual(writer.invalid_values, 1)
+        self.assertEqual(writer.stats.rows, 2)
+
+    def test_schema_metadata_keeps_primary_key_and_incremental(self):
+        self.write([worklog(1)], custom_name="worklogs", pk_override=["id", "issue_id"])
+
+        metadata = pq.read_schema(self.path).metadata
+        self.assertEqual(json.loads(metadata[b"primary_key"]), ["id", "issue_id"])
+        self.assertIs(json.loads(metadata[b"incremental"]), True)
+        self.assertEqual(metadata[b"table"], b"worklogs")
+
+    def test_manifest_of_permanent_file(self):
+        self.write([worklog(1)])
+
+        with open(self.path + ".manifest") as manifest:
+            self.assertEqual(json.load(manifest), {"is_permanent": True, "tags": ["jira", "parquet", "worklogs"]})
+
+
+if __name__ == "__main__":
+    unittest.main()
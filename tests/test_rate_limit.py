@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+import unittest
+
+import httpx
+
+from rate_limit import MAX_BACKOFF, AdaptiveRateLimiter
+from tests.fake_jira import FakeJira
+
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.WARNING)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_burst_of_throttled_responses_is_one_event(self):
+        limiter = AdaptiveRateLimiter(max_rate=20)
+
+        for _ in range(20):
+            limiter.throttle({})
+
+        self.assertEqual(limiter.throttled_count, 20)
+        self.assertEqual(limiter.consecutive_throttles, 1)
+        self.assertEqual(limiter.rate, 10)
+        self.assertLessEqual(limiter.paused_until - time.monotonic(), 2)
+
+    def test_throttled_response_during_pause_extends_it(self):
+        limiter = AdaptiveRateLimiter(max_rate=20)
+
+        limiter.throttle({"Retry-After": "1"})
+        limiter.throttle({"Retry-After": "5"})
+
+        self.assertEqual(limiter.rate, 10)
+        self.assertGreater(limiter.paused_until - time.monotonic(), 4)
+
+    def test_backoff_grows_with_consecutive_events(self):
+        limiter = AdaptiveRateLimiter(max_rate=20)
+
+        for _ in range(3):
+            limiter.paused_until = 0.0
+            limiter.throttle({})
+
+        self.assertEqual(limiter.consecutive_throttles, 3)
+        self.assertEqual(limiter.rate, 2.5)
+        self.assertAlmostEqual(limiter.paused_until - time.monotonic(), min(2 ** 3, MAX_BACKOFF), delta=0.5)
+
+
+class TestRateLimitedClient(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        logging.disable(logging.WARNING)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    async def download(self, fake, requests):
+        fake.route("/field", lambda request: httpx.Response(200, json=[{"id": "summary"}]))
+        jira = fake.client(max_parallel_requests=20)
+
+        started = time.monotonic()
+        results = await asyncio.gather(*[jira.get_fields() for _ in range(requests)])
+        return jira, results, time.monotonic() - started
+
+    async def test_quota_without_retry_after(self):
+        # 20 requests start together against a quota of 20 per second with bursts of 10
+        fake = FakeJira(quota=20, burst=10, latency=0.05)
+
+        jira, results, elapsed = await self.download(fake, 40)
+
+        self.assertEqual(results, [[{"id": "summary"}]] * 40)
+        stats = jira.rate_limiter.stats
+        self.assertEqual(stats["throttled_responses"], fake.throttled)
+        self.assertGreater(fake.throttled, 0)
+        # every burst of 429s pauses for 2s once, instead of an exponential pause per response
+        self.assertLess(stats["throttled_seconds"], 10)
+        self.assertLess(elapsed, 15)
+        self.assertGreaterEqual(stats["current_rate"], 5)
+
+    async def test_quota_with_retry_after(self):
+        fake = FakeJira(quota=20, burst=10, retry_after=1, latency=0.05)
+
+        jira, results, elapsed = await self.download(fake, 40)
+
+        self.assertEqual(len(results), 40)
+        self.assertEqual(jira.rate_limiter.stats["throttled_responses"], fake.throttled)
+        self.assertLess(elapsed, 10)
+        self.assertGreaterEqual(jira.rate_limiter.stats["current_rate"], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
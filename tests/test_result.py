@@ -0,0 +1,130 @@
+import csv
+import io
+import json
+import random
+import unittest
+
+from result import CSV_WRITER_OPTIONS, TABLE_SCHEMAS
+
+
+def flatten_json(x, out=None, name=""):
+    # the full flatten JiraWriter used before the schema knew which paths its columns are built from
+    if out is None:
+        out = dict()
+
+    if type(x) is dict:
+        for a in x:
+            flatten_json(x[a], out, name + a + "_")
+    else:
+        out[name[:-1]] = x
+
+    return out
+
+
+def flatten_and_filter(schema, row, parentDict=None):
+    _cust = row.get("custom_fields", None)
+    _dictToWrite = {}
+
+    for key, value in flatten_json(row).items():
+        if key in schema.json_fields:
+            _dictToWrite[key] = json.dumps(value)
+        elif key in schema.field_set:
+            _dictToWrite[key] = value
+
+    if parentDict is not None:
+        _dictToWrite = {**_dictToWrite, **parentDict}
+
+    if _cust is not None:
+        _dictToWrite = {**_dictToWrite, **{"custom_fields": json.dumps(_cust)}}
+
+    return _dictToWrite
+
+
+def to_csv(schema, rows):
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=schema.fields, **CSV_WRITER_OPTIONS)
+    writer.writerows(rows)
+    return output.getvalue()
+
+
+def random_value(rnd, keys, depth):
+    kind = rnd.random()
+    if depth < 4 and kind < 0.35:
+        return random_dict(rnd, keys, depth + 1)
+    if kind < 0.45:
+        return {}
+    if kind < 0.55:
+        return [rnd.randint(0, 9) for _ in range(rnd.randint(0, 3))]
+    if kind < 0.65:
+        return None
+    if kind < 0.75:
+        return rnd.choice([True, False])
+    if kind < 0.85:
+        return rnd.randint(-1000, 1000)
+    return "".join(rnd.choice("ab_\"\n,") for _ in range(rnd.randint(0, 6)))
+
+
+def random_dict(rnd, keys, depth=0):
+    return {rnd.choice(keys): random_value(rnd, keys, depth) for _ in range(rnd.randint(0, 6))}
+
+
+def random_row(rnd, schema):
+    """A row nesting random columns of the table at random "_" positions, mixed with unrelated keys."""
+    keys = sorted({part for f in schema.fields for part in f.split("_") if part})
+    row = random_dict(rnd, keys + ["unknown", "self"])
+
+    for field in rnd.sample(schema.fields, min(len(schema.fields), rnd.randint(1, 12))):
+        splits = [idx for idx, char in enumerate(field) if char == "_" and 0 < idx < len(field) - 1]
+        path = []
+        start = 0
+        for idx in sorted(rnd.sample(splits, rnd.randint(0, len(splits)))):
+            path.append(field[start:idx])
+            start = idx + 1
+        path.append(field[start:])
+
+        node = row
+        for key in path[:-1]:
+            if type(node.get(key)) is not dict:
+                node[key] = {}
+            node = node[key]
+        node[path[-1]] = random_value(rnd, keys, 3)
+
+    return row
+
+
+class TestTableSchemaFlatten(unittest.TestCase):
+    def test_matches_flatten_then_filter(self):
+        rnd = random.Random(8)
+
+        for schema in TABLE_SCHEMAS.values():
+            for _ in range(300):
+                row = random_row(rnd, schema)
+                with self.subTest(table=schema.name, row=row):
+                    expected = {k: v for k, v in flatten_json(row).items() if k in schema.field_set}
+                    self.assertEqual(schema.flatten(row), expected)
+
+    def test_csv_row_matches_flatten_then_filter(self):
+        rnd = random.Random(80)
+        schema = TABLE_SCHEMAS["issues"]
+
+        rows = []
+        for _ in range(500):
+            row = random_row(rnd, schema)
+            row["custom_fields"] = random_dict(rnd, ["customfield_10001", "customfield_10002"])
+            rows.append(row)
+
+        parent = {"sprint_id": 7}
+        self.assertEqual(
+            to_csv(schema, [schema.csv_row(row, parent) for row in rows]),
+            to_csv(schema, [flatten_and_filter(schema, row, parent) for row in rows]),
+        )
+
+    def test_skips_subtrees_without_columns(self):
+        schema = TABLE_SCHEMAS["issues"]
+        row = {"id": "1", "assignee": {"accountId": "a", "avatarUrls": {"48x48": "x"}}, "watches": {"count": 2}}
+
+        self.assertEqual(schema.flatten(row), {"id": "1", "assignee_accountId": "a"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+import unittest
+
+from scheduler import DatasetScheduler
+
+
+class TestDatasetScheduler(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        logging.disable(logging.INFO)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    async def test_datasets_run_concurrently(self):
+        scheduler = DatasetScheduler()
+        started = []
+        all_started = asyncio.Event()
+
+        async def download(name):
+            started.append(name)
+            if len(started) == 3:
+                all_started.set()
+            await asyncio.wait_for(all_started.wait(), 1)
+
+        for name in ("a", "b", "c"):
+            scheduler.add(name, lambda name=name: download(name))
+
+        await scheduler.run()
+        self.assertEqual(sorted(started), ["a", "b", "c"])
+
+    async def test_failure_cancels_other_datasets_and_raises_its_exception(self):
+        scheduler = DatasetScheduler()
+        cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def failing():
+            raise KeyError("failed")
+
+        scheduler.add("slow", slow)
+        scheduler.add("failing", failing)
+
+        with self.assertRaises(KeyError):
+            await scheduler.run()
+        self.assertTrue(cancelled.is_set())
+
+    def test_duplicate_name(self):
+        scheduler = DatasetScheduler()
+        scheduler.add("a", asyncio.sleep)
+
+        with self.assertRaises(ValueError):
+            scheduler.add("a", asyncio.sleep)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import json
+import random
+import tracemalloc
+import unittest
+
+from adf import DESCRIPTION_RENDERER
+from json_codec import decode_json
+from result import TABLE_SCHEMAS, CsvRowFormatter
+from tests.fixtures import issue, search_page
+from tests.test_result import random_dict
+from transform import format_issue_page, issue_row
+
+
+def transform_issue(issue):
+    # the transformation issues went through before `issue_row`, its result was flattened by the writer afterwards
+    _out = {"id": issue["id"], "key": issue["key"]}
+    _custom = {}
+
+    for key, value in issue["fields"].items():
+        if "customfield_" in key:
+            _custom[key] = value
+        elif key == "description":
+            _out["description"] = DESCRIPTION_RENDERER.render(value).strip("\n").replace("\0", "\\0")
+        else:
+            _out[key] = value
+
+    _out["custom_fields"] = _custom
+    return _out
+
+
+def two_pass_row(issue):
+    return TABLE_SCHEMAS["issues"].csv_row(transform_issue(issue))
+
+
+def random_issue(rnd, i):
+    schema = TABLE_SCHEMAS["issues"]
+    # id and key are attributes of the issue itself, Jira never returns them among its fields
+    keys = sorted({part for f in schema.fields for part in f.split("_") if part} - {"id", "key"})
+
+    result = issue(i, custom_fields=rnd.randint(0, 5), description_paragraphs=rnd.randint(0, 2))
+    result["fields"].update(random_dict(rnd, keys + ["customfield_1", "description_x"]))
+    return result
+
+
+def allocated_per_row(build, issues):
+    """Mean peak of memory traced while a single row is built, the temporary objects of a row and the row itself."""
+    total = 0
+
+    tracemalloc.start()
+    try:
+        for i in issues:
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            build(i)
+            total += tracemalloc.get_traced_memory()[1] - current
+    finally:
+        tracemalloc.stop()
+
+    return total / len(issues)
+
+
+class TestIssueRow(unittest.TestCase):
+    def test_matches_two_pass_transform(self):
+        rnd = random.Random(9)
+
+        for i in range(500):
+            source = random_issue(rnd, i)
+            with self.subTest(issue=source):
+                self.assertEqual(issue_row(source), two_pass_row(source))
+
+    def test_does_not_modify_issue(self):
+        source = issue(1)
+        copy = json.loads(json.dumps(source))
+
+        issue_row(source)
+        self.assertEqual(source, copy)
+
+    def test_allocates_less_than_two_pass_transform(self):
+        issues = [issue(i, custom_fields=60) for i in range(200)]
+
+        self.assertLess(allocated_per_row(issue_row, issues), allocated_per_row(two_pass_row, issues))
+
+
+class TestFormatIssuePage(unittest.TestCase):
+    def test_formats_rows_as_writer(self):
+        issues = [issue(i, histories=3) for i in range(20)]
+        content = json.dumps(search_page(issues, next_page_token="t")).encode()
+
+        page = format_issue_page(content, with_changelogs=True)
+
+        expected = CsvRowFormatter("issues").format(transform_issue(i) for i in decode_json(content)["issues"])
+        self.assertEqual("".join(page.issue_rows), expected)
+        self.assertEqual(page.changelog_counts, [6] * 20)
+        self.assertFalse(page.is_complete)
+        self.assertEqual(page.next_token, "t")
+
+
+if __name__ == "__main__":
+    unittest.main()